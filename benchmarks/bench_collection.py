@@ -0,0 +1,95 @@
+"""
+Measure the time and memory upytest needs to collect and run a very large,
+generated test suite.
+
+This benchmark runs on CPython (rather than in PyScript), with a stand-in for
+the pyscript module. Run it from the root of this repository like this:
+
+    python benchmarks/bench_collection.py [number_of_tests]
+
+The default number of tests is 50,000. A quarter of them are async, and a
+tenth of them are skipped.
+"""
+
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import types
+
+
+def stub_pyscript():
+    """
+    Install a minimal stand-in for the pyscript module, so upytest can be
+    imported outside the browser.
+    """
+    pyscript = types.ModuleType("pyscript")
+    pyscript.RUNNING_IN_WORKER = True
+    sys.modules["pyscript"] = pyscript
+
+
+def generate_test_module(directory, test_count):
+    """
+    Write a test module containing test_count tests into the directory, and
+    return the module's path relative to the directory.
+    """
+    lines = ["import upytest", ""]
+    for i in range(test_count):
+        if i % 10 == 0:
+            lines.append('@upytest.skip("Generated skip.")')
+        if i % 4 == 0:
+            lines.append(f"async def test_{i}():")
+        else:
+            lines.append(f"def test_{i}():")
+        lines.append("    pass")
+    module_path = os.path.join("generated", "test_generated.py")
+    os.makedirs(os.path.join(directory, "generated"))
+    with open(os.path.join(directory, "generated", "__init__.py"), "w"):
+        pass
+    with open(os.path.join(directory, module_path), "w") as f:
+        f.write("\n".join(lines) + "\n")
+    return module_path
+
+
+def main(test_count):
+    stub_pyscript()
+    sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)) or ".")
+    import upytest
+
+    with tempfile.TemporaryDirectory() as directory:
+        module_path = generate_test_module(directory, test_count)
+        os.chdir(directory)
+        sys.path.insert(0, directory)
+        module_instance = upytest.import_module(module_path)
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        module = upytest.TestModule(module_path, module_instance)
+        collection_time = time.perf_counter() - start
+        collection_memory, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        assert len(module.tests) == test_count
+
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            asyncio.run(module.run())
+        run_time = time.perf_counter() - start
+
+    print(f"Tests: {test_count}")
+    print(
+        f"Collection: {collection_time:.3f} s"
+        f" ({collection_time / test_count * 1e6:.2f} us/test)"
+    )
+    print(
+        f"Collection memory: {collection_memory / 1024:.0f} KiB"
+        f" ({collection_memory / test_count:.0f} bytes/test)"
+    )
+    print(f"Run: {run_time:.3f} s ({run_time / test_count * 1e6:.2f} us/test)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
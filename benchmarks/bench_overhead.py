@@ -0,0 +1,322 @@
+"""
+Measure the overhead of upytest's own machinery (discovery, harvesting tests
+from modules, working out which tests are async, dispatching setup and
+teardown, printing progress and the summary) for several generated test
+suites of different shapes.
+
+This benchmark runs on CPython (rather than in PyScript), with a stand-in for
+the pyscript module. Run it from the root of this repository like this:
+
+    python benchmarks/bench_overhead.py [--scale SCALE] [--output FILE]
+                                        [--compare FILE]
+
+The results are printed and, if an output file is given, stored as JSON. To
+see how a change affects the overhead, store the results before the change
+and compare them with the results after it:
+
+    python benchmarks/bench_overhead.py --output before.json
+    # ... make the change ...
+    python benchmarks/bench_overhead.py --compare before.json
+
+The generated test suites are:
+
+* many_modules: lots of small test modules (with a conftest.py).
+* many_tests: one module containing lots of tiny tests.
+* many_failures: one module whose tests all fail.
+* deep_classes: lots of test classes, each with lots of test methods.
+* setup_teardown: tests with (async) setup and teardown functions.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+import types
+
+
+#: The shape of each generated test suite at a scale of 1: the number of
+#: modules, and the number of tests (or test classes and methods) in each.
+SCENARIOS = {
+    "many_modules": {"modules": 200, "tests": 25},
+    "many_tests": {"modules": 1, "tests": 20000},
+    "many_failures": {"modules": 1, "tests": 2000},
+    "deep_classes": {"modules": 1, "classes": 100, "methods": 50},
+    "setup_teardown": {"modules": 1, "tests": 5000},
+}
+
+
+def stub_pyscript():
+    """
+    Install a minimal stand-in for the pyscript module, so upytest can be
+    imported outside the browser.
+    """
+    pyscript = types.ModuleType("pyscript")
+    pyscript.RUNNING_IN_WORKER = True
+    pyscript.window = types.SimpleNamespace(
+        console=types.SimpleNamespace(log=lambda *args: None)
+    )
+    sys.modules["pyscript"] = pyscript
+
+
+def write(path, lines):
+    """
+    Write the lines of Python code to the file at path.
+    """
+    with open(path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def module_lines(name, shape, index):
+    """
+    Return the lines of the index-th test module of the named test suite,
+    along with the number of tests it contains.
+    """
+    lines = ["import upytest", ""]
+    if name == "deep_classes":
+        for c in range(shape["classes"]):
+            lines.append(f"class TestClass{c}:")
+            for m in range(shape["methods"]):
+                lines.append(f"    def test_{m}(self):")
+                lines.append("        pass")
+            lines.append("")
+        return lines, shape["classes"] * shape["methods"]
+    if name == "setup_teardown":
+        lines += [
+            "async def setup():",
+            "    pass",
+            "",
+            "def teardown():",
+            "    pass",
+            "",
+        ]
+    for t in range(shape["tests"]):
+        if name != "many_failures" and t % 4 == 0:
+            lines.append(f"async def test_{index}_{t}():")
+        else:
+            lines.append(f"def test_{index}_{t}():")
+        if name == "many_failures":
+            lines.append("    assert False, 'Generated failure.'")
+        else:
+            lines.append("    pass")
+    return lines, shape["tests"]
+
+
+def generate(directory, name, shape):
+    """
+    Write the named test suite into its own package in the directory, and
+    return the package's path (relative to the directory), the number of
+    modules and the number of tests.
+    """
+    package = f"bench_{name}"
+    os.makedirs(os.path.join(directory, package))
+    write(os.path.join(directory, package, "__init__.py"), [""])
+    if name == "many_modules":
+        write(
+            os.path.join(directory, package, "conftest.py"),
+            ["def setup():", "    pass", "", "def teardown():", "    pass"],
+        )
+    test_count = 0
+    for index in range(shape["modules"]):
+        lines, count = module_lines(name, shape, index)
+        write(os.path.join(directory, package, f"test_{index}.py"), lines)
+        test_count += count
+    return package, shape["modules"], test_count
+
+
+def scaled(shape, scale):
+    """
+    Return the shape of a test suite with its sizes multiplied by the scale
+    (the number of methods per class is never scaled).
+    """
+    return dict(
+        [
+            (key, value if key == "methods" else max(1, int(value * scale)))
+            for key, value in shape.items()
+        ]
+    )
+
+
+def measure(function):
+    """
+    Call the function twice, first to time it, then to trace the peak memory
+    it allocates. Return the result of the first call, the time taken (in
+    seconds) and the peak memory (in bytes).
+    """
+    start = time.perf_counter()
+    result = function()
+    duration = time.perf_counter() - start
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, duration, peak
+
+
+def quietly(function):
+    """
+    Return a function that calls the given function with the standard output
+    discarded.
+    """
+
+    def wrapper():
+        with contextlib.redirect_stdout(io.StringIO()):
+            return function()
+
+    return wrapper
+
+
+def bench_scenario(upytest, package, test_count):
+    """
+    Measure the collection and running of the test suite in the package,
+    and return a dictionary of the results.
+    """
+    # The first collection also imports the modules, so it is timed separately
+    # from the overhead of collection alone.
+    start = time.perf_counter()
+    quietly(lambda: upytest.discover([package], "test_*.py"))()
+    import_time = time.perf_counter() - start
+    modules, collection_time, collection_peak = measure(
+        quietly(lambda: upytest.discover([package], "test_*.py"))
+    )
+    assert sum([m.test_count for m in modules]) == test_count
+
+    async def consume():
+        async for outcome in upytest.iter_run(package):
+            pass
+
+    _, iter_run_time, _ = measure(quietly(lambda: asyncio.run(consume())))
+    result, run_time, run_peak = measure(
+        quietly(lambda: asyncio.run(upytest.run(package)))
+    )
+    outcomes = sum([len(result[bucket]) for bucket in upytest.RESULT_BUCKETS])
+    assert outcomes == test_count
+    return {
+        "tests": test_count,
+        "import_and_collection_s": import_time,
+        "collection_s": collection_time,
+        "collection_us_per_test": collection_time / test_count * 1e6,
+        "collection_peak_kib": collection_peak / 1024,
+        "run_s": run_time,
+        "run_us_per_test": run_time / test_count * 1e6,
+        "run_peak_kib": run_peak / 1024,
+        "iter_run_s": iter_run_time,
+        # The time taken to print the summary, tracebacks and so on at the
+        # end of the run.
+        "summary_s": max(0, run_time - iter_run_time),
+    }
+
+
+def bench_is_awaitable(upytest, count=100000):
+    """
+    Return the time, in nanoseconds, is_awaitable takes per call, averaged
+    over sync and async functions.
+    """
+
+    def sync_test():
+        pass
+
+    async def async_test():
+        pass
+
+    functions = [sync_test, async_test] * (count // 2)
+    start = time.perf_counter()
+    for function in functions:
+        upytest.is_awaitable(function)
+    return (time.perf_counter() - start) / len(functions) * 1e9
+
+
+def compare(results, baseline):
+    """
+    Print the change of each result from the baseline results, as a
+    percentage (a positive change means slower, or more memory).
+    """
+    print(f"\nCompared with {baseline['timestamp']}:")
+    for name, scenario in results["scenarios"].items():
+        previous = baseline["scenarios"].get(name)
+        if not previous:
+            continue
+        changes = []
+        for key in (
+            "collection_us_per_test",
+            "collection_peak_kib",
+            "run_us_per_test",
+            "run_peak_kib",
+        ):
+            if previous.get(key):
+                change = (scenario[key] - previous[key]) / previous[key] * 100
+                changes.append(f"{key} {change:+.1f}%")
+        print(f"{name:<16} " + ", ".join(changes))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--scale",
+        type=float,
+        default=1,
+        help="multiply the size of each generated test suite by this",
+    )
+    parser.add_argument("--output", help="store the results as JSON here")
+    parser.add_argument("--compare", help="JSON results to compare with")
+    args = parser.parse_args()
+
+    stub_pyscript()
+    root = os.path.abspath(os.path.dirname(os.path.dirname(__file__)))
+    sys.path.insert(0, root)
+    import upytest
+
+    results = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version,
+        "platform": platform.platform(),
+        "scale": args.scale,
+        "is_awaitable_ns": bench_is_awaitable(upytest),
+        "scenarios": {},
+    }
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        sys.path.insert(0, directory)
+        try:
+            for name, shape in SCENARIOS.items():
+                package, module_count, test_count = generate(
+                    directory, name, scaled(shape, args.scale)
+                )
+                scenario = bench_scenario(upytest, package, test_count)
+                scenario["modules"] = module_count
+                results["scenarios"][name] = scenario
+        finally:
+            os.chdir(cwd)
+
+    print(f"is_awaitable: {results['is_awaitable_ns']:.0f} ns/call")
+    print(
+        f"{'scenario':<16}{'tests':>8}{'collect us/test':>17}"
+        f"{'collect KiB':>13}{'run us/test':>13}{'run KiB':>10}"
+        f"{'summary s':>11}"
+    )
+    for name, scenario in results["scenarios"].items():
+        print(
+            f"{name:<16}{scenario['tests']:>8}"
+            f"{scenario['collection_us_per_test']:>17.2f}"
+            f"{scenario['collection_peak_kib']:>13.0f}"
+            f"{scenario['run_us_per_test']:>13.2f}"
+            f"{scenario['run_peak_kib']:>10.0f}"
+            f"{scenario['summary_s']:>11.3f}"
+        )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""
+Measure how long upytest takes to start: the time from "import upytest" to
+the end of the import, and to the start of the first test, in a fresh
+interpreter each time. Since every test run in PyScript pays this cost before
+any test runs, it matters most for small test suites (and on MicroPython,
+where importing modules is relatively expensive).
+
+Run it from the root of this repository like this:
+
+    python benchmarks/bench_startup.py [--python PYTHON] [--repeat REPEAT]
+                                       [--output FILE] [--compare FILE]
+
+The interpreter used for the measurements defaults to the one running this
+script, but may be another, such as the MicroPython unix port:
+
+    python benchmarks/bench_startup.py --python micropython
+
+The results are printed and, if an output file is given, stored as JSON. To
+see how a change affects start up, store the results before the change and
+compare them with the results after it:
+
+    python benchmarks/bench_startup.py --output before.json
+    # ... make the change ...
+    python benchmarks/bench_startup.py --compare before.json
+
+Each measurement is the median of the repeated runs, after a first run (not
+measured) in which the interpreter may compile and cache upytest.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+
+#: A minimal stand-in for the pyscript module, so upytest can be imported
+#: outside the browser.
+PYSCRIPT_STUB = """
+RUNNING_IN_WORKER = True
+
+
+class _Namespace:
+    pass
+
+
+window = _Namespace()
+window.console = _Namespace()
+window.console.log = lambda *args: None
+"""
+
+
+#: The script run in each fresh interpreter. It prints a line of the form
+#: "STARTUP <import us> <first test us> <modules imported>" at the end.
+SCRIPT = """
+import sys
+import time
+
+sys.path.insert(0, {root!r})
+sys.path.insert(0, {directory!r})
+
+if hasattr(time, "ticks_us"):
+    now = time.ticks_us
+    diff = time.ticks_diff
+else:
+    now = lambda: int(time.perf_counter() * 1000000)
+    diff = lambda end, start: end - start
+
+modules = len(sys.modules)
+start = now()
+import upytest
+imported = now()
+modules = len(sys.modules) - modules
+first_test = []
+
+
+class FirstTest:
+    def on_test_start(self, test_case):
+        if not first_test:
+            first_test.append(now())
+
+
+upytest.asyncio.run(upytest.run("startup_tests", plugins=[FirstTest()]))
+print("STARTUP", diff(imported, start), diff(first_test[0], start), modules)
+"""
+
+
+def generate(directory, test_count):
+    """
+    Write the pyscript stand-in, a small test suite and the script to run
+    into the directory, and return the path of the script.
+    """
+    with open(os.path.join(directory, "pyscript.py"), "w") as f:
+        f.write(PYSCRIPT_STUB)
+    os.makedirs(os.path.join(directory, "startup_tests"))
+    with open(os.path.join(directory, "startup_tests", "__init__.py"), "w"):
+        pass
+    with open(
+        os.path.join(directory, "startup_tests", "test_startup.py"), "w"
+    ) as f:
+        for t in range(test_count):
+            f.write(f"def test_{t}():\n    pass\n\n")
+    root = os.path.abspath(os.path.dirname(os.path.dirname(__file__)))
+    script = os.path.join(directory, "startup.py")
+    with open(script, "w") as f:
+        f.write(SCRIPT.format(root=root, directory=directory))
+    return script
+
+
+def measure(python, script, directory):
+    """
+    Run the script in a fresh interpreter, and return the time taken by the
+    whole process, the import of upytest and the start of the first test (in
+    milliseconds), along with the number of modules the import added.
+    """
+    start = time.perf_counter()
+    output = subprocess.run(
+        [python, script],
+        cwd=directory,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    process_ms = (time.perf_counter() - start) * 1000
+    line = [l for l in output.splitlines() if l.startswith("STARTUP ")][-1]
+    _, import_us, first_test_us, modules = line.split()
+    return {
+        "process_ms": process_ms,
+        "import_ms": int(import_us) / 1000,
+        "first_test_ms": int(first_test_us) / 1000,
+        "modules_imported": int(modules),
+    }
+
+
+def median(values):
+    """
+    Return the median of the list of values.
+    """
+    values = sorted(values)
+    middle = len(values) // 2
+    if len(values) % 2:
+        return values[middle]
+    return (values[middle - 1] + values[middle]) / 2
+
+
+def compare(results, baseline):
+    """
+    Print the change of each result from the baseline results, as a
+    percentage (a positive change means slower).
+    """
+    print(f"\nCompared with {baseline['timestamp']}:")
+    changes = []
+    for key in ("import_ms", "first_test_ms", "process_ms"):
+        if baseline.get(key):
+            change = (results[key] - baseline[key]) / baseline[key] * 100
+            changes.append(f"{key} {change:+.1f}%")
+    print(", ".join(changes))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--python",
+        default=sys.executable,
+        help="the interpreter to measure (defaults to this one)",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=20,
+        help="the number of fresh interpreters to measure",
+    )
+    parser.add_argument(
+        "--tests",
+        type=int,
+        default=10,
+        help="the number of tests in the generated test suite",
+    )
+    parser.add_argument("--output", help="store the results as JSON here")
+    parser.add_argument("--compare", help="JSON results to compare with")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        script = generate(directory, args.tests)
+        measure(args.python, script, directory)
+        runs = [
+            measure(args.python, script, directory)
+            for _ in range(args.repeat)
+        ]
+
+    results = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": args.python,
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "tests": args.tests,
+    }
+    for key in runs[0]:
+        results[key] = median([run[key] for run in runs])
+    print(f"import upytest:     {results['import_ms']:.2f} ms")
+    print(f"start of 1st test:  {results['first_test_ms']:.2f} ms")
+    print(f"whole process:      {results['process_ms']:.2f} ms")
+    print(f"modules imported:   {results['modules_imported']:.0f}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
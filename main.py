@@ -24,20 +24,28 @@ MicroPython, the index2.html file uses Pyodide.
 That's it! Now we can test a test framework with a meta-test framework. 🤯
 """
 
+import os
+import sys
+import json
 from pyscript.web import page, div, h2, p, b
 import upytest
+import tests.conftest
+import tests.test_timeout
+import tests.test_fixture_scopes
 
 
 expected_results = {
     "result_all": {
-        "passes": 11,
-        "fails": 9,
-        "skipped": 6,
+        "passes": 46,
+        "fails": 13,
+        "skipped": 9,
+        "timeouts": 1,
     },
     "result_random": {
-        "passes": 11,
-        "fails": 9,
-        "skipped": 6,
+        "passes": 46,
+        "fails": 13,
+        "skipped": 9,
+        "timeouts": 1,
     },
     "result_module": {
         "passes": 10,
@@ -49,35 +57,356 @@ expected_results = {
         "fails": 3,
         "skipped": 2,
     },
+    "result_exitfirst": {
+        "passes": 2,
+        "fails": 1,
+        "skipped": 2,
+        "not_run": 20,
+    },
+    "result_last_failed": {
+        "passes": 0,
+        "fails": 9,
+        "skipped": 0,
+    },
     "result_specific": {
         "passes": 1,
         "fails": 0,
         "skipped": 0,
     },
+    "result_parametrized_case": {
+        "passes": 1,
+        "fails": 0,
+        "skipped": 0,
+    },
+    "result_concurrent": {
+        "passes": 5,
+        "fails": 0,
+        "skipped": 0,
+    },
+    "result_sharded": {
+        "passes": 46,
+        "fails": 13,
+        "skipped": 9,
+        "timeouts": 1,
+    },
+    "result_keyword": {
+        "passes": 2,
+        "fails": 0,
+        "skipped": 0,
+    },
+    "result_marker": {
+        "passes": 1,
+        "fails": 0,
+        "skipped": 0,
+    },
+    "result_nested": {
+        "passes": 1,
+        "fails": 0,
+        "skipped": 0,
+    },
+    "result_isolated": {
+        "passes": 1,
+        "fails": 0,
+        "skipped": 0,
+    },
+    "result_watched": {
+        "passes": 1,
+        "fails": 0,
+        "skipped": 0,
+    },
+    "result_manifest": {
+        "passes": 47,
+        "fails": 13,
+        "skipped": 9,
+        "timeouts": 1,
+    },
 }
 
 actual_results = {}
 # Run all tests in the tests directory.
 print("\033[1mRunning all tests in directory...\033[0m")
 actual_results["result_all"] = await upytest.run("./tests")
+module_fixture_counts = (
+    tests.test_fixture_scopes.SETUP_MODULE_COUNT,
+    tests.test_fixture_scopes.TEARDOWN_MODULE_COUNT,
+)
 # Run all tests in the tests directory in random order.
 print("\n\n\033[1mRunning all tests in directory in random order...\033[0m")
 actual_results["result_random"] = await upytest.run("./tests", random=True)
 # Run all tests in a specific module.
 print("\n\n\033[1mRunning all tests in a specific module...\033[0m")
 actual_results["result_module"] = await upytest.run(
-    "tests/test_core_functionality.py"
+    "tests/test_core_functionality.py", durations=5
 )
 # Run all tests in a specific test class.
 print("\n\n\033[1mRunning all tests in a specific class...\033[0m")
 actual_results["result_class"] = await upytest.run(
     "tests/test_core_functionality.py::TestClass"
 )
+# Run a specific test in a sub-directory with a nested conftest.py.
+print("\n\n\033[1mRunning a test with nested conftest.py files...\033[0m")
+actual_results["result_nested"] = await upytest.run(
+    "tests/nested/test_nested_conftest.py::test_nested_setup_passes"
+)
+nested_fixture_calls = list(tests.conftest.FIXTURE_CALLS)
+# Run all tests in a specific module, stopping at the first failure.
+print("\n\n\033[1mRunning tests in a module until the first failure...\033[0m")
+actual_results["result_exitfirst"] = await upytest.run(
+    "tests/test_core_functionality.py", exitfirst=True
+)
+# Run all tests in a specific module, remembering which failed, then re-run
+# only those that failed.
+print("\n\n\033[1mRe-running only the tests that failed last time...\033[0m")
+cache = upytest.FileCache("upytest_cache.json")
+cache.save({})
+await upytest.run("tests/test_core_functionality.py", cache=cache)
+actual_results["result_last_failed"] = await upytest.run(
+    "tests/test_core_functionality.py", cache=cache, last_failed=True
+)
+# Run all the tests in a module, starting with those that failed last time.
+print("\n\n\033[1mRunning the tests that failed last time first...\033[0m")
+failed_first_outcomes = []
+async for outcome in upytest.iter_run(
+    "tests/test_core_functionality.py", cache=cache, failed_first=True
+):
+    failed_first_outcomes.append(outcome["status"])
+# The failed tests still run first when the order is randomized.
+random_failed_first_outcomes = []
+async for outcome in upytest.iter_run(
+    "tests/test_core_functionality.py",
+    cache=cache,
+    failed_first=True,
+    random=True,
+):
+    random_failed_first_outcomes.append(outcome["status"])
+# None of the tests that failed last time are in this module, so all of its
+# tests are run.
+result_no_last_failed = await upytest.run(
+    "tests/test_concurrency.py", cache=cache, last_failed=True
+)
+os.remove(cache.path)
 # Run a specific test function.
 print("\n\n\033[1mRun a specific function...\033[0m")
 actual_results["result_specific"] = await upytest.run(
     "tests/test_core_functionality.py::test_passes"
 )
+# Run a specific case of a parametrized test.
+print("\n\n\033[1mRun a specific case of a parametrized test...\033[0m")
+actual_results["result_parametrized_case"] = await upytest.run(
+    "tests/test_parametrize.py::test_add_passes[3-4-7]"
+)
+# Run a test with plugins that record each event of the test run.
+print("\n\n\033[1mRun a test with plugins...\033[0m")
+
+
+class EventRecorder:
+    """
+    A plugin that records the hooks called during the test run.
+    """
+
+    def __init__(self):
+        self.events = []
+
+    def on_session_start(self, test_run):
+        self.events.append("session_start")
+
+    def on_session_finish(self, test_run):
+        self.events.append("session_finish")
+
+    def on_module_collected(self, test_module):
+        self.events.append("module_collected")
+
+    def on_test_start(self, test_case):
+        self.events.append("test_start")
+
+    def on_test_finish(self, test_case):
+        self.events.append(f"test_finish:{test_case.status}")
+
+    def on_setup_start(self, test_case):
+        self.events.append("setup_start")
+
+    def on_setup_finish(self, test_case):
+        self.events.append("setup_finish")
+
+    def on_teardown_start(self, test_case):
+        self.events.append("teardown_start")
+
+    def on_teardown_finish(self, test_case):
+        self.events.append("teardown_finish")
+
+
+class TestFinishCounter:
+    """
+    A plugin that only implements one hook.
+    """
+
+    count = 0
+
+    def on_test_finish(self, test_case):
+        self.count += 1
+
+
+recorder = EventRecorder()
+counter = TestFinishCounter()
+await upytest.run(
+    "tests/test_with_setup_teardown.py", plugins=[recorder, counter]
+)
+skipped_recorder = EventRecorder()
+await upytest.run(
+    "tests/test_core_functionality.py::test_skipped",
+    plugins=[skipped_recorder],
+)
+# Run tests while recording their heap usage.
+print("\n\n\033[1mRun tests recording heap usage...\033[0m")
+result_memory = await upytest.run(
+    "tests/test_memory.py", memory=True, gc_collect=True
+)
+# Run a test module, writing JUnit XML and JSON Lines reports as it runs.
+print("\n\n\033[1mRun tests writing reports...\033[0m")
+result_reported = await upytest.run(
+    "tests/test_core_functionality.py",
+    junitxml="upytest_report.xml",
+    jsonl="upytest_report.jsonl",
+)
+with open("upytest_report.xml") as f:
+    junit_xml = f.read()
+with open("upytest_report.jsonl") as f:
+    reported_outcomes = [json.loads(line) for line in f]
+os.remove("upytest_report.xml")
+os.remove("upytest_report.jsonl")
+# Run a test module twice, isolated, so it is imported afresh each time and
+# unloaded once it has run.
+print("\n\n\033[1mRun an isolated test module twice...\033[0m")
+isolated_import_count = tests.conftest.ISOLATED_IMPORT_COUNT
+for _ in range(2):
+    actual_results["result_isolated"] = await upytest.run(
+        "tests/test_isolation.py", isolate=True
+    )
+isolated_import_count = (
+    tests.conftest.ISOLATED_IMPORT_COUNT - isolated_import_count
+)
+isolated_module_unloaded = "tests.test_isolation" not in sys.modules
+# Watch generated test modules for changes, then change the module one of
+# them imports, so only that test module is run again.
+print("\n\n\033[1mWatch test modules for changes...\033[0m")
+
+
+def write_file(path, text):
+    with open(path, "w") as f:
+        f.write(text)
+
+
+def remove_tree(path):
+    for name in os.listdir(path):
+        child = path + "/" + name
+        if os.stat(child)[0] & 0x4000:
+            remove_tree(child)
+        else:
+            os.remove(child)
+    os.rmdir(path)
+
+
+if "watched" in os.listdir():
+    remove_tree("watched")
+os.mkdir("watched")
+write_file("watched/__init__.py", "")
+write_file("watched/helper.py", "VALUE = 1\n")
+write_file(
+    "watched/test_helper.py",
+    "from watched import helper\n\n\n"
+    "def test_value_passes():\n    assert helper.VALUE == 10\n",
+)
+write_file("watched/test_other.py", "def test_other_passes():\n    pass\n")
+# An earlier run imports the test modules before they are watched.
+await upytest.run("watched")
+watcher = upytest.Watcher(["watched"])
+watcher.start()
+result_watched_first = await upytest.run("watched")
+watcher.check()
+write_file("watched/helper.py", "VALUE = 10\n")
+watched_targets = watcher.check()
+actual_results["result_watched"] = await upytest.run(*watched_targets)
+watcher.stop()
+remove_tree("watched")
+# Run async tests concurrently.
+print("\n\n\033[1mRun async tests concurrently...\033[0m")
+actual_results["result_concurrent"] = await upytest.run(
+    "tests/test_concurrency.py", concurrency=4
+)
+# Run only the tests selected by a keyword expression.
+print("\n\n\033[1mRun tests selected by a keyword expression...\033[0m")
+actual_results["result_keyword"] = await upytest.run("./tests", keyword="quick")
+# Run a specific test with a global time limit it exceeds.
+print("\n\n\033[1mRun a specific test with a timeout...\033[0m")
+teardown_count = tests.test_timeout.TEARDOWN_COUNT
+result_timeout = await upytest.run(
+    "tests/test_timeout.py::test_slow_passes,test_never_resolves_timeouts",
+    timeout=0.05,
+)
+teardown_count = tests.test_timeout.TEARDOWN_COUNT - teardown_count
+# Run a specific failing test, reporting only its failing line.
+print("\n\n\033[1mRun a specific failing test with one line tracebacks...\033[0m")
+result_tb_line = await upytest.run(
+    "tests/test_core_functionality.py::test_fails", tb="line"
+)
+# The same, keeping no characters of its traceback but the exception.
+result_tb_chars = await upytest.run(
+    "tests/test_core_functionality.py::test_fails", tb_chars=0
+)
+# Stream the outcomes of the tests in a specific module as they finish.
+print("\n\n\033[1mStream the outcomes of tests in a module...\033[0m")
+streamed_outcomes = []
+async for outcome in upytest.iter_run("tests/test_core_functionality.py"):
+    streamed_outcomes.append(outcome)
+# Stop streaming after the first outcome, closing the test run.
+print("\n\n\033[1mStop streaming the outcomes after the first...\033[0m")
+closed_recorder = EventRecorder()
+async with upytest.iter_run(
+    "tests/test_fixture_scopes.py",
+    plugins=[closed_recorder],
+    jsonl="upytest_closed.jsonl",
+) as test_run:
+    async for outcome in test_run:
+        session_active_while_streaming = tests.conftest.SESSION_ACTIVE
+        break
+session_active_after_close = tests.conftest.SESSION_ACTIVE
+with open("upytest_closed.jsonl") as f:
+    closed_lines = f.read().splitlines()
+os.remove("upytest_closed.jsonl")
+# Run all tests in the tests directory split across two shards.
+print("\n\n\033[1mRun all tests in two shards...\033[0m")
+shards = [
+    await upytest.run("./tests", shard_index=i, shard_count=2) for i in range(2)
+]
+actual_results["result_sharded"] = upytest.merge_results(*shards)
+# Run all tests in the tests directory, collected via a manifest recorded by
+# an earlier run.
+print("\n\n\033[1mRun all tests via a discovery manifest...\033[0m")
+manifest_path = "upytest_manifest.json"
+if manifest_path in os.listdir():
+    os.remove(manifest_path)
+await upytest.run("./tests", manifest=manifest_path)
+assert manifest_path in os.listdir(), "The manifest was not recorded."
+# A parametrized test's cases may change without its module changing.
+tests.conftest.SQUARE_COUNT = 6
+actual_results["result_manifest"] = await upytest.run(
+    "./tests", manifest=manifest_path
+)
+tests.conftest.SQUARE_COUNT = 5
+# Run a single case of a parametrized test, via the manifest.
+result_manifest_case = await upytest.run(
+    "tests/test_parametrize.py::test_add_passes[3-4-7]", manifest=manifest_path
+)
+# Run only the tests selected by a marker expression, via the manifest.
+print("\n\n\033[1mRun tests selected by a marker expression...\033[0m")
+actual_results["result_marker"] = await upytest.run(
+    "./tests", manifest=manifest_path, marker="sluggish and not network"
+)
+os.remove(manifest_path)
+# Find test modules while ignoring some of them, by name and by path.
+module_paths, walked = upytest.find_modules(
+    "./tests", "test_*.py", ["test_parametrize.py", "tests/test_m*"]
+)
 
 # Evaluate the results have the right number of tests.
 for name, result in expected_results.items():
@@ -92,21 +421,235 @@ for name, result in expected_results.items():
 # in "skipped".
 for test_run, result in actual_results.items():  # result_all, result_module, etc.
     for test_status, matching_tests in result.items():  # passes, fails, skipped
-        if test_status in ["passes", "fails", "skipped"]:
+        if test_status in ["passes", "fails", "skipped", "timeouts"]:
             for test in matching_tests:
-                assert test["test_name"].endswith(
-                    test_status
-                ), f"Test {test["test_name"]} does not end with {test_status}"
+                # Ignore the id of a case of a parametrized test. A skipped
+                # module is reported by its name alone.
+                name = test["test_name"] or test["module_name"][:-3]
+                assert (
+                    name.split("[")[0].endswith(test_status)
+                ), f"Test {name} does not end with {test_status}"
+
+# Ensure each case of a parametrized test is reported with its own id.
+parametrized_node_ids = [
+    test["node_id"]
+    for test in actual_results["result_all"]["passes"]
+    if test["module_name"].endswith("test_parametrize.py")
+]
+for node_id in [
+    "test_add_passes[1-2-3]",
+    "test_square_passes[4-16]",
+    "test_ids_passes[two]",
+    "TestParametrized.test_method_passes[bb]",
+]:
+    assert (
+        f"tests/test_parametrize.py::{node_id}" in parametrized_node_ids
+    ), f"Missing parametrized test {node_id}"
+
+# Ensure the plugins' hooks were called, in order, at each point of the run.
+assert recorder.events == [
+    "module_collected",
+    "session_start",
+    "test_start",
+    "setup_start",
+    "setup_finish",
+    "teardown_start",
+    "teardown_finish",
+    "test_finish:pass",
+    "session_finish",
+], f"Unexpected plugin events: {recorder.events}"
+assert counter.count == 1, "The on_test_finish hook was not called."
+# Ensure a skipped test doesn't run the setup and teardown around it.
+assert skipped_recorder.events == [
+    "module_collected",
+    "session_start",
+    "test_start",
+    "test_finish:skipped",
+    "session_finish",
+], f"Unexpected plugin events: {skipped_recorder.events}"
+# Ensure a skipped module is reported as a single skipped test.
+module_skipped = [
+    test
+    for test in actual_results["result_all"]["skipped"]
+    if test["module_name"].endswith("test_module_skipped.py")
+]
+assert len(module_skipped) == 1, "The skipped module was not reported."
+assert module_skipped[0]["test_name"] == "", "Bad skipped module name."
+assert module_skipped[0]["reason"] == "This module is skipped."
+# Ensure what the skipped module decorated before it was skipped is forgotten.
+for registry in (upytest._TEST_TIMEOUTS, upytest._TEST_MARKERS):
+    for func, value in registry.values():
+        assert (
+            func.__name__ != "test_decorated_before_skip_fails"
+        ), "A skipped module's test was not forgotten."
+
+# Ensure closing a test run early still tears down the session, and tells
+# the plugins (so the reporter wrote what finished, then closed its file).
+assert session_active_while_streaming, "Session setup did not run."
+assert not session_active_after_close, "Session teardown did not run."
+assert closed_recorder.events[-1] == "session_finish", "Session not finished."
+assert closed_lines, "The report was not written."
+assert json.loads(closed_lines[0])["node_id"] == outcome["node_id"]
+
+# Ensure the reports contain every test, in the order they finished.
+reported = [
+    outcome
+    for status in ["passes", "fails", "skipped"]
+    for outcome in result_reported[status]
+]
+assert len(reported_outcomes) == len(reported) == 25, "Missing JSON lines."
+assert sorted([o["node_id"] for o in reported_outcomes]) == sorted(
+    [o["node_id"] for o in reported]
+), "Unexpected JSON lines."
+assert junit_xml.startswith("<?xml"), "Not an XML document."
+assert junit_xml.strip().endswith("</testsuites>"), "Unfinished JUnit XML."
+assert junit_xml.count("<testsuite ") == 1, "Expected one test suite."
+assert junit_xml.count("<testcase ") == 25, "Missing JUnit test cases."
+assert junit_xml.count("<failure ") == len(result_reported["fails"])
+assert junit_xml.count("<skipped ") == len(result_reported["skipped"])
+assert 'classname="tests.test_core_functionality.TestClass"' in junit_xml
+
+# Ensure the test that leaked memory is the biggest growth in heap usage.
+growths = result_memory["memory"]["growths"]
+assert growths[0]["node_id"].endswith("test_leak_passes"), "Leak not found."
+assert growths[0]["growth"] >= 10000, "Leak not measured."
+memory_modules = result_memory["memory"]["modules"]
+assert len(memory_modules) == 1, "Module heap usage not recorded."
+assert memory_modules[0]["peak"] >= memory_modules[0]["after"]
+
+# Ensure benchmarks record the statistics of their timings.
+benchmarks = [
+    test
+    for test in actual_results["result_all"]["passes"]
+    if test["module_name"].endswith("test_benchmark.py")
+]
+assert len(benchmarks) == 3, "Missing benchmarks."
+for test in benchmarks:
+    stats = test["benchmark"]
+    assert stats["min"] <= stats["median"] <= stats["max"], "Bad statistics."
+    assert stats["min"] <= stats["mean"] <= stats["max"], "Bad statistics."
+    assert stats["ops"] > 0, "Bad operations per second."
+    if test["test_name"] == "test_fixed_iterations_passes":
+        assert stats["rounds"] == 2 and stats["iterations"] == 10
 
 # Ensure the randomized tests are different from the non-randomized tests.
 for test_status in ["passes", "fails", "skipped"]:
-    assert (
-        actual_results["result_all"][test_status]
-        != actual_results["result_random"][test_status]
-    ), f"Randomized tests are the same as non-randomized tests for {test_status}"
+    assert [
+        test["node_id"] for test in actual_results["result_all"][test_status]
+    ] != [
+        test["node_id"] for test in actual_results["result_random"][test_status]
+    ], f"Randomized tests are the same as non-randomized tests for {test_status}"
+
+# Ensure only the selected case ran when its module was imported lazily.
+assert [test["node_id"] for test in result_manifest_case["passes"]] == [
+    "tests/test_parametrize.py::test_add_passes[3-4-7]"
+], "Deselected cases ran via the manifest."
+
+# Ensure the concurrent tests overlapped: four tests that each sleep for 0.1
+# seconds should take much less than 0.4 seconds when run together.
+assert (
+    actual_results["result_concurrent"]["duration"] < 0.3
+), "Concurrent tests did not overlap."
+
+# Ensure tests without their own time limit use the global timeout, and that
+# teardown runs even for tests that time out.
+assert (
+    len(result_timeout["timeouts"]) == 2
+), "The global timeout was not applied."
+assert teardown_count == 2, "Teardown did not run for tests that timed out."
+# Ensure tests that raise a TimeoutError themselves fail, with a traceback.
+for test in actual_results["result_all"]["fails"]:
+    if "raises_timeout_error" in test["test_name"]:
+        assert "Raised by the" in test["traceback"], "Traceback was lost."
+
+# Ensure the module setup and teardown ran once for the whole module, and the
+# session teardown ran at the end of the test run.
+assert module_fixture_counts == (1, 1), "Module fixtures did not run once."
+assert not tests.conftest.SESSION_ACTIVE, "Session teardown did not run."
+
+# Ensure the setup and teardown functions of nested conftest.py files were
+# chained, with the outermost setup first and its teardown last.
+assert nested_fixture_calls == [
+    "setup",
+    "nested setup",
+    "nested teardown",
+    "teardown",
+], "Nested conftest.py fixtures were not chained."
+
+# Ensure the isolated test module was imported afresh for each run, and
+# unloaded afterwards.
+assert isolated_import_count == 2, "Isolated module not imported afresh."
+assert isolated_module_unloaded, "Isolated module not unloaded."
+
+# Ensure only the test module affected by the change was run again, with the
+# changed module imported afresh.
+assert (
+    len(result_watched_first["passes"]) == 1
+    and len(result_watched_first["fails"]) == 1
+), "Unexpected results before the watched module changed."
+assert watched_targets == [
+    "watched/test_helper.py"
+], "Unexpected test modules affected by the change."
+
+# Ensure the tests that failed last time were run before the other tests.
+assert failed_first_outcomes[:9] == ["fail"] * 9, "Failed tests not run first."
+assert len(failed_first_outcomes) == 25, "Not every test was run."
+assert random_failed_first_outcomes[:9] == ["fail"] * 9, "Not run first."
+assert len(result_no_last_failed["passes"]) == 5, "Not every test was run."
+
+# Ensure one line tracebacks only describe the failing line of the test.
+traceback = result_tb_line["fails"][0]["traceback"]
+assert "\n" not in traceback, "The traceback has more than one line."
+assert "test_core_functionality.py:" in traceback, "No failing line."
+assert traceback.endswith(
+    "AssertionError: This test will fail"
+), "No exception in the traceback."
+assert (
+    result_tb_chars["fails"][0]["traceback"]
+    == "...\nAssertionError: This test will fail"
+), "The exception was not kept in the limited traceback."
+
+# Ensure every test was streamed, with its outcome, as soon as it finished.
+assert len(streamed_outcomes) == 25, "Not every outcome was streamed."
+for outcome in streamed_outcomes:
+    assert outcome["node_id"].startswith(
+        "tests/test_core_functionality.py::"
+    ), f"Unexpected streamed test {outcome['node_id']}"
+    assert outcome["status"] in ("pass", "fail", "skipped")
+    assert outcome["duration"] >= 0
+
+# Ensure each test records how long each phase of running it took.
+for test_status in ["passes", "fails", "skipped"]:
+    for test in actual_results["result_module"][test_status]:
+        phases = (
+            test["setup_duration"]
+            + test["call_duration"]
+            + test["teardown_duration"]
+        )
+        assert test["duration"] == phases, f"Bad durations for {test['node_id']}"
+
+# Ensure test modules are found in sorted order, skipping the ignored ones.
+assert module_paths == sorted(module_paths), "Test modules not sorted."
+assert "tests/test_core_functionality.py" in module_paths, "Module not found."
+assert "tests/test_parametrize.py" not in module_paths, "Name not ignored."
+assert "tests/test_memory.py" not in module_paths, "Path not ignored."
+assert walked == ["tests", "tests/nested"], "Unexpected directories walked."
+
+# Ensure the shards are disjoint and, together, run every test exactly once.
+shard_node_ids = [
+    set(
+        f"{test['module_name']}::{test['test_name']}"
+        for test_status in ["passes", "fails", "skipped"]
+        for test in result[test_status]
+    )
+    for result in shards
+]
+assert not (
+    shard_node_ids[0] & shard_node_ids[1]
+), "The same test was run in more than one shard."
+assert all(shard_node_ids), "A shard was empty."
 
 # Ensure the results are JSON serializable.
-import json
 check = json.dumps(actual_results)
 
 # Create a div to display the results in the page.
@@ -118,7 +661,8 @@ page.append(
                 b("All Tests: "),
                 f"Passes: {len(actual_results['result_all']['passes'])},"
                 f" Fails: {len(actual_results['result_all']['fails'])},"
-                f" Skipped: {len(actual_results['result_all']['skipped'])}.",
+                f" Skipped: {len(actual_results['result_all']['skipped'])},"
+                f" Timeouts: {len(actual_results['result_all']['timeouts'])}.",
             ),
         ),
         div(
@@ -154,6 +698,39 @@ page.append(
                 f" Skipped: {len(actual_results['result_specific']['skipped'])}.",
             ),
         ),
+        div(
+            p(
+                b("Sharded Tests: "),
+                f"Passes: {len(actual_results['result_sharded']['passes'])},"
+                f" Fails: {len(actual_results['result_sharded']['fails'])},"
+                f" Skipped: {len(actual_results['result_sharded']['skipped'])}.",
+                f" (Merged from {len(shards)} shards).",
+            ),
+        ),
+        div(
+            p(
+                b("Tests via a Manifest: "),
+                f"Passes: {len(actual_results['result_manifest']['passes'])},"
+                f" Fails: {len(actual_results['result_manifest']['fails'])},"
+                f" Skipped: {len(actual_results['result_manifest']['skipped'])}.",
+            ),
+        ),
+        div(
+            p(
+                b("Tests selected by keyword: "),
+                f"Passes: {len(actual_results['result_keyword']['passes'])},"
+                f" Fails: {len(actual_results['result_keyword']['fails'])},"
+                f" Skipped: {len(actual_results['result_keyword']['skipped'])}.",
+            ),
+        ),
+        div(
+            p(
+                b("Concurrent Tests: "),
+                f"Passes: {len(actual_results['result_concurrent']['passes'])},"
+                f" Fails: {len(actual_results['result_concurrent']['fails'])},"
+                f" Skipped: {len(actual_results['result_concurrent']['skipped'])}.",
+            ),
+        ),
         style={
             "background-color": "lightgreen",
             "padding": "10px",
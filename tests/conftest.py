@@ -1,9 +1,33 @@
 from pyscript import window
 
 
+#: Set while the test session is running (see test_fixture_scopes.py).
+SESSION_ACTIVE = False
+#: The setup and teardown calls since the last setup (see tests/nested).
+FIXTURE_CALLS = []
+#: The number of times test_isolation.py has been imported.
+ISOLATED_IMPORT_COUNT = 0
+#: The number of cases of test_square_passes in test_parametrize.py.
+SQUARE_COUNT = 5
+
+
+def setup_session():
+    global SESSION_ACTIVE
+    SESSION_ACTIVE = True
+    window.console.log("Session setup from conftest.py")
+
+
+def teardown_session():
+    global SESSION_ACTIVE
+    SESSION_ACTIVE = False
+    window.console.log("Session teardown from conftest.py")
+
+
 def setup():
+    FIXTURE_CALLS[:] = ["setup"]
     window.console.log("Setup from conftest.py")
 
 
 def teardown():
+    FIXTURE_CALLS.append("teardown")
     window.console.log("Teardown from conftest.py")
@@ -0,0 +1,11 @@
+import asyncio
+from tests import conftest
+
+
+async def setup():
+    await asyncio.sleep(0)
+    conftest.FIXTURE_CALLS.append("nested setup")
+
+
+def teardown():
+    conftest.FIXTURE_CALLS.append("nested teardown")
@@ -0,0 +1,16 @@
+"""
+Tests in a sub-directory with its own conftest.py, whose setup and teardown
+functions are chained with those of the conftest.py in the directory above.
+"""
+
+from tests import conftest
+
+
+def test_nested_setup_passes():
+    """
+    The outer setup ran before the nested setup.
+    """
+    assert conftest.FIXTURE_CALLS == [
+        "setup",
+        "nested setup",
+    ], conftest.FIXTURE_CALLS
@@ -0,0 +1,22 @@
+"""
+Tests for benchmarks. A benchmarked test is called repeatedly, and the
+statistics of how long each call took are recorded in its result.
+"""
+
+import asyncio
+import upytest
+
+
+@upytest.benchmark(min_time=0.001)
+def test_sum_passes():
+    assert sum(range(100)) == 4950
+
+
+@upytest.benchmark(rounds=3, min_time=0.001)
+async def test_async_sleep_passes():
+    await asyncio.sleep(0)
+
+
+@upytest.benchmark(rounds=2, warmup_rounds=0, iterations=10)
+def test_fixed_iterations_passes():
+    assert sorted([3, 1, 2]) == [1, 2, 3]
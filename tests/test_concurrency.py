@@ -0,0 +1,47 @@
+"""
+Tests for the concurrent execution mode. When run with a concurrency greater
+than one, the async tests in this module overlap while they sleep, so the
+module takes about as long as its slowest test. The serial test must never
+overlap with any other test.
+"""
+
+import asyncio
+import upytest
+
+
+#: The number of concurrent tests currently sleeping.
+RUNNING = 0
+
+
+async def sleep_while_running(seconds):
+    global RUNNING
+    RUNNING += 1
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        RUNNING -= 1
+
+
+async def test_concurrent_one_passes():
+    await sleep_while_running(0.1)
+
+
+async def test_concurrent_two_passes():
+    await sleep_while_running(0.1)
+
+
+async def test_concurrent_three_passes():
+    await sleep_while_running(0.1)
+
+
+async def test_concurrent_four_passes():
+    await sleep_while_running(0.1)
+
+
+@upytest.serial()
+async def test_serial_passes():
+    """
+    Tests decorated with `@upytest.serial` never overlap with other tests.
+    """
+    assert RUNNING == 0, "A serial test overlapped with another test."
+    await sleep_while_running(0.01)
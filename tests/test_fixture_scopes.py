@@ -0,0 +1,51 @@
+"""
+Tests for module and session scoped setup and teardown. The setup_module and
+teardown_module functions are called once for the whole module, while the
+setup_session and teardown_session functions in conftest.py are called once
+for the whole test run.
+"""
+
+import asyncio
+from tests import conftest
+
+
+#: The number of times setup_module has been called.
+SETUP_MODULE_COUNT = 0
+#: The number of times teardown_module has been called.
+TEARDOWN_MODULE_COUNT = 0
+#: Set while the module's tests are running.
+MODULE_ACTIVE = False
+
+
+async def setup_module():
+    global SETUP_MODULE_COUNT, MODULE_ACTIVE
+    await asyncio.sleep(0)
+    SETUP_MODULE_COUNT += 1
+    MODULE_ACTIVE = True
+
+
+def teardown_module():
+    global TEARDOWN_MODULE_COUNT, MODULE_ACTIVE
+    TEARDOWN_MODULE_COUNT += 1
+    MODULE_ACTIVE = False
+
+
+def test_module_setup_passes():
+    """
+    The module setup has run before the first test.
+    """
+    assert MODULE_ACTIVE, "The module setup has not run."
+
+
+def test_module_setup_runs_once_passes():
+    """
+    The module setup runs once per test run, not once per test.
+    """
+    assert SETUP_MODULE_COUNT == TEARDOWN_MODULE_COUNT + 1
+
+
+def test_session_setup_passes():
+    """
+    The session setup in conftest.py has run before the first test.
+    """
+    assert conftest.SESSION_ACTIVE, "The session setup has not run."
@@ -0,0 +1,17 @@
+"""
+A test module that counts the number of times it has been imported, to check
+that it is imported afresh for each test run when test modules are isolated
+(see main.py).
+"""
+
+from tests import conftest
+
+
+conftest.ISOLATED_IMPORT_COUNT += 1
+
+
+def test_imported_passes():
+    """
+    The module has been imported at least once.
+    """
+    assert conftest.ISOLATED_IMPORT_COUNT > 0
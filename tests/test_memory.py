@@ -0,0 +1,17 @@
+"""
+Tests for recording heap usage. One test keeps a reference to the memory it
+allocates (as if it leaked it), and the other doesn't.
+"""
+
+
+#: Memory that is never released, as if leaked by a test.
+LEAKED = []
+
+
+def test_leak_passes():
+    LEAKED.append(bytearray(10000))
+
+
+def test_no_leak_passes():
+    data = bytearray(10000)
+    assert len(data) == 10000
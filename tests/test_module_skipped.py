@@ -0,0 +1,23 @@
+"""
+A test module that is skipped as a whole, as soon as it is imported, so none
+of its tests are collected.
+"""
+
+import upytest
+
+
+@upytest.timeout(0.01)
+@upytest.mark("abandoned")
+def test_decorated_before_skip_fails():
+    """
+    Decorated before the module is skipped, so registered by the decorators
+    but never collected (and then forgotten by them).
+    """
+    assert False, "This test is never collected."
+
+
+upytest.skip_module("This module is skipped.")
+
+
+def test_never_collected_fails():
+    assert False, "This test is never collected."
@@ -0,0 +1,61 @@
+"""
+Tests for parametrized tests. Each case of a parametrized test is run, and
+reported, as a separate test.
+"""
+
+import asyncio
+import upytest
+from tests import conftest
+
+
+@upytest.parametrize("x,y,total", [(1, 2, 3), (3, 4, 7)])
+def test_add_passes(x, y, total):
+    assert x + y == total
+
+
+def squares():
+    """
+    The cases are generated lazily, each time they are needed, from data
+    kept outside this module (so their number may change without the module
+    changing).
+    """
+    for n in range(conftest.SQUARE_COUNT):
+        yield n, n * n
+
+
+@upytest.parametrize("n,square", squares)
+def test_square_passes(n, square):
+    assert n**2 == square
+
+
+@upytest.parametrize("value", [1, 3])
+def test_even_fails(value):
+    assert value % 2 == 0, "This test will fail"
+
+
+@upytest.parametrize(
+    "value",
+    [
+        upytest.param(1, skip="This case will be skipped"),
+        upytest.param(2, skip="This case will also be skipped"),
+    ],
+)
+def test_case_skipped(value):
+    assert False, "This case should not run"
+
+
+@upytest.parametrize("delay", [0, 0.01])
+async def test_async_passes(delay):
+    await asyncio.sleep(delay)
+
+
+@upytest.parametrize("x", [1, 2], ids=["one", "two"])
+def test_ids_passes(x):
+    assert x in (1, 2)
+
+
+class TestParametrized:
+
+    @upytest.parametrize("word", ["a", "bb"])
+    def test_method_passes(self, word):
+        assert len(word) in (1, 2)
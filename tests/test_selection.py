@@ -0,0 +1,44 @@
+"""
+Tests with markers, for selecting tests by keyword and marker expressions.
+"""
+
+import asyncio
+import upytest
+
+
+@upytest.mark("quick")
+def test_quick_passes():
+    assert True
+
+
+@upytest.mark("sluggish")
+async def test_sluggish_passes():
+    await asyncio.sleep(0)
+
+
+@upytest.mark("sluggish", "network")
+def test_sluggish_network_passes():
+    assert True
+
+
+@upytest.mark("quick")
+class TestMarked:
+
+    def test_marked_method_passes(self):
+        assert True
+
+
+def test_keyword_expression_passes():
+    """
+    Keyword expressions are parsed once, then evaluated against the words
+    describing each test.
+    """
+    expression = upytest.KeywordExpression("add and not (slow or dom)")
+    assert expression.matches(["test_math.py", "test_add"])
+    assert not expression.matches(["test_math.py", "test_add", "slow"])
+    assert not expression.matches(["test_math.py", "test_subtract"])
+    exact = upytest.KeywordExpression("slow", exact=True)
+    assert not exact.matches(["slowest"])
+    for invalid in ("", "and", "not", "(slow", "slow)", "slow fast"):
+        with upytest.raises(ValueError):
+            upytest.KeywordExpression(invalid)
@@ -0,0 +1,59 @@
+"""
+Tests for time limits. A test that takes longer than its time limit is
+cancelled and reported as timed out, but its teardown still runs.
+"""
+
+import asyncio
+import upytest
+
+
+#: The number of times the teardown function has been called.
+TEARDOWN_COUNT = 0
+
+
+def teardown():
+    global TEARDOWN_COUNT
+    TEARDOWN_COUNT += 1
+
+
+@upytest.timeout(0.05)
+async def test_never_resolves_timeouts():
+    """
+    An async test that never resolves is cancelled once it reaches its time
+    limit.
+    """
+    await asyncio.Event().wait()
+
+
+@upytest.timeout(1)
+async def test_within_time_limit_passes():
+    """
+    An async test that finishes within its time limit passes as usual.
+    """
+    await asyncio.sleep(0.01)
+
+
+async def test_slow_passes():
+    """
+    This test only times out if the test suite is run with a timeout shorter
+    than the time it sleeps.
+    """
+    await asyncio.sleep(0.1)
+
+
+@upytest.timeout(1)
+def test_raises_timeout_error_fails():
+    """
+    A test that raises a TimeoutError itself fails (with its traceback),
+    rather than timing out.
+    """
+    raise asyncio.TimeoutError("Raised by the test.")
+
+
+@upytest.timeout(1)
+async def test_async_raises_timeout_error_fails():
+    """
+    An async test that raises a TimeoutError itself, well within its time
+    limit, fails rather than timing out.
+    """
+    raise asyncio.TimeoutError("Raised by the async test.")
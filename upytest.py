@@ -25,29 +25,32 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
 
+# Only the modules every test run needs are imported here. Others (such as
+# random and traceback) are imported when first needed, to keep the start up
+# time of a test run down, especially on MicroPython.
 import sys
 import os
-import io
-import inspect
+import gc
 import time
-import random
-from pathlib import Path
 import asyncio
 from pyscript import RUNNING_IN_WORKER
 
-try:
-    # Pyodide.
-    from traceback import print_exception
-except ImportError:
-    # MicroPython
-    from sys import print_exception
-
 
 __all__ = [
     "discover",
     "raises",
     "skip",
+    "serial",
+    "timeout",
+    "mark",
+    "parametrize",
+    "param",
+    "benchmark",
     "run",
+    "iter_run",
+    "merge_results",
+    "watch",
+    "skip_module",
 ]
 
 
@@ -55,10 +58,64 @@ __all__ = [
 is_micropython = "micropython" in sys.version.lower()
 
 
-#: To contain reasons given for any skipped tests: {id(test_function): reason}
+# The registries filled by the decorators. Each is keyed by the id of the
+# decorated function (or class), and holds a (function, value) tuple. Keeping
+# the function means its id can't be reused by another function while it is
+# registered (see _registered).
+
+#: To contain skipped test functions and the reasons given for skipping them:
+#: {id(test_function): (test_function, reason)}
 _SKIPPED_TESTS = {}
 
 
+#: To contain async test functions that must never run concurrently:
+#: {id(test_function): (test_function, True)}
+_SERIAL_TESTS = {}
+
+
+#: To contain time limits for any async tests:
+#: {id(test_function): (test_function, seconds)}
+_TEST_TIMEOUTS = {}
+
+
+#: To contain the markers of any marked tests or test classes:
+#: {id(test_function_or_class): (test_function_or_class, (marker, ...))}
+_TEST_MARKERS = {}
+
+
+#: To contain the options of any benchmarked tests:
+#: {id(test_function): (test_function, Benchmark)}
+_BENCHMARKS = {}
+
+
+#: To contain the cases of any parametrized tests:
+#: {id(test_function): (test_function, (argnames, cases, ids))}
+_PARAMETRIZED_TESTS = {}
+
+
+def _registered(registry, func, default=None):
+    """
+    Return the value held for the function (or class) in the registry, or
+    the default if it isn't registered.
+    """
+    entry = registry.get(id(func))
+    if entry is not None and entry[0] is func:
+        return entry[1]
+    return default
+
+
+def _registered_id(registry, function_id, default=None):
+    """
+    Return the value held in the registry for the function with the given id
+    (e.g. that of the function behind a bound method), or the default. Since
+    the registry keeps the function, the id can't belong to another function.
+    """
+    entry = registry.get(function_id)
+    if entry is not None:
+        return entry[1]
+    return default
+
+
 # Possible states for a test case.
 #: The test is yet to run.
 PENDING = "pending"
@@ -68,6 +125,62 @@ PASS = "pass"
 FAIL = "fail"
 #: The test was skipped.
 SKIPPED = "skipped"
+#: The test took longer than its time limit.
+TIMEOUT = "timeout"
+#: The test was not run, because the test run stopped early.
+NOT_RUN = "not_run"
+
+
+#: The keys of the lists of tests, bucketed by outcome, in the result of a run.
+RESULT_BUCKETS = ("passes", "fails", "skipped", "timeouts", "not_run")
+
+
+if hasattr(time, "ticks_us"):
+    # MicroPython: a microsecond counter that wraps around, so differences
+    # must be calculated via ticks_diff (and are only valid for intervals of
+    # up to about nine minutes, so longer ones are timed with time.time).
+
+    def timer():
+        """
+        Return an opaque timestamp from the best available clock, for use with
+        elapsed.
+        """
+        return time.ticks_us()
+
+    def elapsed(start):
+        """
+        Return the number of seconds since the start timestamp from timer.
+        """
+        return time.ticks_diff(time.ticks_us(), start) / 1000000
+
+else:
+
+    def timer():
+        """
+        Return an opaque timestamp from the best available clock, for use with
+        elapsed.
+        """
+        return time.perf_counter()
+
+    def elapsed(start):
+        """
+        Return the number of seconds since the start timestamp from timer.
+        """
+        return time.perf_counter() - start
+
+
+if is_micropython:
+
+    def _generator_function():
+        yield
+
+    #: The type of generator functions, which, in MicroPython, is also the type
+    #: of async functions (checked directly, rather than importing inspect).
+    _GENERATOR_FUNCTION = type(_generator_function)
+
+else:
+    # Already imported by asyncio, so this costs nothing extra.
+    from inspect import iscoroutinefunction
 
 
 def is_awaitable(obj):
@@ -82,9 +195,28 @@ def is_awaitable(obj):
         # an async function except via the repr. This is a bit hacky.
         if "<closure <generator>" in repr(obj):
             return True
-        return inspect.isgeneratorfunction(obj)
+        return isinstance(obj, _GENERATOR_FUNCTION)
+
+    return iscoroutinefunction(obj)
+
+
+async def call_fixture(fixture):
+    """
+    Call the given setup or teardown function, awaiting it if needed.
+    """
+    if is_awaitable(fixture):
+        await fixture()
+    else:
+        fixture()
 
-    return inspect.iscoroutinefunction(obj)
+
+def module_name(module_path):
+    """
+    Return the dotted name under which the module at the given file path is
+    imported (e.g. "tests.test_module" for "./tests/test_module.py").
+    """
+    dotted_path = str(module_path).replace("/", ".").replace(".py", "")
+    return dotted_path.lstrip(".")
 
 
 def import_module(module_path):
@@ -92,8 +224,7 @@ def import_module(module_path):
     Import a module from a given file path, in a way that works with both
     MicroPython and Pyodide.
     """
-    dotted_path = str(module_path).replace("/", ".").replace(".py", "")
-    dotted_path = dotted_path.lstrip(".")
+    dotted_path = module_name(module_path)
     module = __import__(dotted_path)
     for part in dotted_path.split(".")[1:]:
         module = getattr(module, part)
@@ -104,10 +235,14 @@ def parse_traceback_from_exception(ex):
     """
     Parse the traceback from an exception object.
     """
+    import io
+
     traceback_data = io.StringIO()
     if is_micropython:
-        print_exception(ex, traceback_data)
+        sys.print_exception(ex, traceback_data)
     else:
+        from traceback import print_exception
+
         print_exception(ex, file=traceback_data)
     traceback_data.seek(0)
     raw_traceback = traceback_data.read()
@@ -121,6 +256,115 @@ def parse_traceback_from_exception(ex):
     return "\n".join(result)
 
 
+class TracebackFormat:
+    """
+    Describes how the traceback of a failing test is formatted, so the cost
+    of formatting (and keeping) the tracebacks of many failing tests can be
+    limited.
+    """
+
+    __slots__ = ("mode", "depth", "chars")
+
+    #: The available modes: the full traceback, or a single line of the form
+    #: "path:line: ExceptionType: message" for the failing line of the test.
+    modes = ("long", "line")
+
+    def __init__(self, mode="long", depth=None, chars=None):
+        """
+        A TracebackFormat is instantiated with the mode, and optional limits
+        on the depth (the number of most recent frames to show from each
+        traceback) and the number of characters of the formatted traceback
+        (the end of which, with the exception, is kept).
+        """
+        if mode not in self.modes:
+            raise ValueError(f"Unknown traceback mode: {mode}")
+        self.mode = mode
+        self.depth = depth
+        self.chars = chars
+
+    def format(self, ex):
+        """
+        Return the traceback of the exception as a string in this format.
+        """
+        if self.mode == "line":
+            result = self._format_line(ex)
+        else:
+            result = parse_traceback_from_exception(ex)
+            if self.depth is not None:
+                result = self._limit_depth(result)
+        if self.chars is not None and len(result) > self.chars:
+            result = self._limit_chars(result)
+        return result
+
+    def _limit_chars(self, text):
+        """
+        Limit the text to its last chars characters, but always keep the
+        whole of its final line (the exception), even if it is longer.
+        """
+        body, _, last = text.rstrip("\n").rpartition("\n")
+        room = self.chars - len(last)
+        if room > 0 and body:
+            return "...\n" + body[-room:] + "\n" + last
+        return "...\n" + last
+
+    def _format_line(self, ex):
+        """
+        Return a single line describing where, in the test, the exception was
+        raised and the exception itself.
+        """
+        location = None
+        tb = getattr(ex, "__traceback__", None)
+        if tb is not None:
+            # Avoid formatting the whole traceback, where possible.
+            while tb is not None:
+                filename = tb.tb_frame.f_code.co_filename
+                if not filename.endswith("upytest.py"):
+                    location = f"{filename}:{tb.tb_lineno}"
+                tb = tb.tb_next
+        else:
+            # MicroPython: find the last frame from its formatted traceback.
+            for line in parse_traceback_from_exception(ex).split("\n"):
+                line = line.strip()
+                if line.startswith("File ") and "upytest.py" not in line:
+                    parts = line.split(", ")
+                    location = parts[0][5:].strip('"') + ":" + parts[1][5:]
+        message = f"{type(ex).__name__}: {ex}"
+        if location:
+            return f"{location}: {message}"
+        return message
+
+    def _limit_depth(self, text):
+        """
+        Limit each traceback in the text to its most recent frames.
+        """
+        result = []
+        frames = []
+        for line in text.split("\n") + [None]:
+            if line is not None and line.startswith("  "):
+                if line.startswith("  File "):
+                    frames.append([line])
+                elif frames:
+                    frames[-1].append(line)
+                else:
+                    result.append(line)
+                continue
+            # The end of a run of frames.
+            if len(frames) > self.depth:
+                hidden = len(frames) - self.depth
+                result.append(f"  ... ({hidden} earlier frame[s] hidden)")
+                frames = frames[hidden:]
+            for frame in frames:
+                result.extend(frame)
+            frames = []
+            if line is not None:
+                result.append(line)
+        return "\n".join(result)
+
+
+#: The traceback format used unless another is given.
+_DEFAULT_TRACEBACK_FORMAT = TracebackFormat()
+
+
 def shuffle(a_list):
     """
     Shuffle a list, in place. 
@@ -135,6 +379,8 @@ def shuffle(a_list):
     
     https://stackoverflow.com/questions/73143243/are-there-any-alternatives-for-the-python-module-randoms-shuffle-function-in
     """
+    import random
+
     if hasattr(random, "shuffle"):
         random.shuffle(a_list)
     else:
@@ -143,265 +389,2524 @@ def shuffle(a_list):
             a_list[i], a_list[j] = a_list[j], a_list[i]
 
 
-class TestCase:
+class Output:
     """
-    Represents an individual test to run.
+    Buffers the progress output of a test run, so it is written in one go
+    (and, on the main thread, control is yielded to the event loop so the
+    page can repaint) at most once per time slice, rather than once per test.
     """
 
-    def __init__(self, test_function, module_name, test_name, function_id):
+    def __init__(self, time_slice=0.016):
         """
-        A TestCase is instantiated with a callable test_function, the name of
-        the module containing the test, the name of the test within the module
-        and the unique Python id of the test function.
+        An Output is instantiated with the length of the time slice, in
+        seconds. The default is about one frame of a 60Hz display.
         """
-        self.test_function = test_function
-        self.module_name = str(module_name)
-        self.test_name = test_name
-        self.function_id = function_id
-        self.status = PENDING  # the initial state of the test.
-        self.traceback = None  # to contain details of any failure.
-        self.reason = None  # to contain the reason for skipping the test.
+        self.time_slice = time_slice
+        self._buffer = []
+        self._start = timer()
 
-    async def run(self):
+    def write(self, text):
         """
-        Run the test function and set the status and traceback attributes, as
-        required.
+        Add the text to the buffer of output to be printed.
         """
-        if self.function_id in _SKIPPED_TESTS:
-            self.status = SKIPPED
-            self.reason = _SKIPPED_TESTS.get(self.function_id)
-            if not self.reason:
-                self.reason = "No reason given."
-            return
-        try:
-            if is_awaitable(self.test_function):
-                await self.test_function()
+        self._buffer.append(text)
+
+    def flush(self):
+        """
+        Print all the buffered output.
+        """
+        if self._buffer:
+            text = "".join(self._buffer)
+            self._buffer = []
+            if is_micropython:
+                # MicroPython doesn't flush.
+                print(text, end="")
             else:
-                self.test_function()
-            self.status = PASS
-        except Exception as ex:
-            self.status = FAIL
-            self.traceback = parse_traceback_from_exception(ex)
+                print(text, end="", flush=True)
 
-    @property
-    def as_dict(self):
+    async def tick(self):
         """
-        Return a dictionary representation of the test case.
+        If the current time slice is over, print the buffered output and, if
+        running on the main thread, yield to the event loop.
         """
-        return {
-            "module_name": self.module_name,
-            "test_name": self.test_name,
-            "status": self.status,
-            "traceback": self.traceback,
-            "reason": self.reason,
-        }
+        if elapsed(self._start) < self.time_slice:
+            return
+        self.flush()
+        if not RUNNING_IN_WORKER:
+            await asyncio.sleep(0)
+        self._start = timer()
 
 
-class TestModule:
+#: The buffered output shared by all test modules.
+output = Output()
+
+
+#: The names of the hooks a plugin may implement, as methods of the same name.
+HOOK_NAMES = (
+    "on_session_start",
+    "on_session_finish",
+    "on_module_collected",
+    "on_module_start",
+    "on_module_finish",
+    "on_test_start",
+    "on_test_finish",
+    "on_setup_start",
+    "on_setup_finish",
+    "on_teardown_start",
+    "on_teardown_finish",
+)
+
+
+class Hooks:
     """
-    Represents a module containing tests.
+    The hooks implemented by the plugins of a test run.
+
+    A plugin is any object with methods named after one or more of the
+    HOOK_NAMES. Each hook is an attribute that is None if no plugin
+    implements it, otherwise a function calling every plugin's
+    implementation in turn (with the same arguments), so calling a hook
+    that isn't implemented costs no more than checking the attribute:
+
+    if hooks.on_test_start:
+        hooks.on_test_start(test_case)
+
+    The hooks, and their arguments, are:
+
+    * on_session_start(test_run): before the first test is run.
+    * on_session_finish(test_run): after the last test has finished.
+    * on_module_collected(test_module): for each test module collected.
+    * on_module_start(test_module) and on_module_finish(test_module): around
+      running the tests in each test module (including its setup_module and
+      teardown_module).
+    * on_test_start(test_case): before each test (and its setup) is run.
+    * on_test_finish(test_case): once the outcome of each test is known.
+    * on_setup_start(test_case) and on_setup_finish(test_case): around the
+      setup function run before each test.
+    * on_teardown_start(test_case) and on_teardown_finish(test_case): around
+      the teardown function run after each test.
     """
 
-    def __init__(self, path, module, setup=None, teardown=None):
+    def __init__(self, plugins=()):
         """
-        A TestModule is instantiated with a path to its location on the
-        filesystem and an object representing the Python module itself.
-
-        Optional global setup and teardown callables may also be supplied. If
-        the module already contains valid setup/teardown functions, these will
-        be used instead.
+        Hooks are instantiated with a list of plugins, whose hooks are called
+        in the order of the list.
         """
-        self.path = path
-        self.module = module
-        self._setup = setup
-        self._teardown = teardown
-        self._tests = []
-        local_setup_teardown = False
-        # Harvest references to test functions, setup and teardown.
-        for name, item in self.module.__dict__.items():
-            if callable(item) or is_awaitable(item):
-                if name.startswith("test"):
-                    # A simple test function.
-                    t = TestCase(item, self.path, name, id(item))
-                    self._tests.append(t)
-                elif inspect.isclass(item) and name.startswith("Test"):
-                    # A test class, so check for test methods.
-                    instance = item()
-                    for method_name, method in item.__dict__.items():
-                        if callable(method) or is_awaitable(method):
-                            if method_name.startswith("test"):
-                                t = TestCase(
-                                    getattr(instance, method_name),
-                                    self.path,
-                                    f"{name}.{method_name}",
-                                    id(method),
-                                )
-                                self._tests.append(t)
-                elif name == "setup":
-                    # A local setup function.
-                    self._setup = item
-                    local_setup_teardown = True
-                elif name == "teardown":
-                    # A local teardown function.
-                    self._teardown = item
-                    local_setup_teardown = True
-        if local_setup_teardown:
-            print(
-                f"Using \033[1mlocal\033[0m setup and teardown for \033[1m{self.path}\033[0m."
-            )
+        self.plugins = list(plugins)
+        for name in HOOK_NAMES:
+            implementations = [
+                getattr(plugin, name)
+                for plugin in self.plugins
+                if hasattr(plugin, name)
+            ]
+            setattr(self, name, self._combine(implementations))
 
-    @property
-    def tests(self):
+    def _combine(self, implementations):
         """
-        Return a list containing TestCase instances drawn from the
-        content of the test module.
+        Return None, or a function that calls each of the implementations.
         """
-        return self._tests
+        if not implementations:
+            return None
+        if len(implementations) == 1:
+            return implementations[0]
+
+        def call_all(*args):
+            for implementation in implementations:
+                implementation(*args)
+
+        return call_all
+
+
+#: The hooks used when no plugins are given.
+_NO_HOOKS = Hooks()
+
+
+class MemoryMonitor:
+    """
+    A plugin that records heap usage before and after each test and each
+    test module, to find tests that leak memory (which, on MicroPython's
+    small heap, may make later tests fail with a MemoryError).
+
+    On MicroPython, heap usage is measured with gc.mem_alloc, so the peak
+    usage of a module is the highest usage measured before or after its
+    tests. Elsewhere (e.g. CPython or Pyodide), it is measured with
+    tracemalloc, which also records the true peak usage of each module.
+
+    If collect is True, garbage is collected before each measurement, so the
+    growth of the heap is only due to objects that are still referenced.
+    Only the top biggest growths are kept. When tests run concurrently,
+    their growths include the allocations of the tests they overlap with.
+    """
+
+    def __init__(self, collect=False, top=10):
+        self.collect = collect
+        self.top = top
+        self.growths = []  # (growth, node_id) of the biggest growths.
+        self.modules = []  # the usage of each module, as a dictionary.
+        self._before = {}  # usage before each running test: {id: bytes}
+        self._module = None  # the usage of the currently running module.
+        self._started = False
+        self._tracemalloc = None
+        if not hasattr(gc, "mem_alloc"):
+            import tracemalloc
+
+            self._tracemalloc = tracemalloc
 
     @property
-    def setup(self):
+    def backend(self):
         """
-        Get the setup function for the module.
+        Return the name of the way heap usage is measured.
         """
-        return self._setup
+        return "tracemalloc" if self._tracemalloc else "gc"
 
-    @property
-    def teardown(self):
+    def usage(self):
         """
-        Get the teardown function for the module.
+        Return the number of bytes currently allocated on the heap.
         """
-        return self._teardown
+        if self.collect:
+            gc.collect()
+        if self._tracemalloc:
+            return self._tracemalloc.get_traced_memory()[0]
+        return gc.mem_alloc()
+
+    def on_session_start(self, test_run):
+        if self._tracemalloc and not self._tracemalloc.is_tracing():
+            self._tracemalloc.start()
+            self._started = True
+
+    def on_session_finish(self, test_run):
+        if self._started:
+            self._tracemalloc.stop()
+            self._started = False
+
+    def on_module_start(self, test_module):
+        usage = self.usage()
+        if self._tracemalloc and hasattr(self._tracemalloc, "reset_peak"):
+            self._tracemalloc.reset_peak()
+        self._module = {
+            "module": test_module.path,
+            "before": usage,
+            "after": usage,
+            "growth": 0,
+            "peak": usage,
+        }
+
+    def on_module_finish(self, test_module):
+        module = self._module
+        usage = self.usage()
+        module["after"] = usage
+        module["growth"] = usage - module["before"]
+        if self._tracemalloc and hasattr(self._tracemalloc, "reset_peak"):
+            module["peak"] = self._tracemalloc.get_traced_memory()[1]
+        module["peak"] = max(module["peak"], usage)
+        self.modules.append(module)
+        self._module = None
+
+    def on_test_start(self, test_case):
+        usage = self.usage()
+        self._before[id(test_case)] = usage
+        if self._module and usage > self._module["peak"]:
+            self._module["peak"] = usage
+
+    def on_test_finish(self, test_case):
+        usage = self.usage()
+        if self._module and usage > self._module["peak"]:
+            self._module["peak"] = usage
+        before = self._before.pop(id(test_case), None)
+        if before is None:
+            return
+        growth = usage - before
+        if growth <= 0:
+            return
+        if len(self.growths) < self.top or growth > self.growths[-1][0]:
+            self.growths.append((growth, test_case.node_id))
+            self.growths.sort(key=lambda g: g[0], reverse=True)
+            del self.growths[self.top :]
 
-    def limit_tests_to(self, test_names):
+    @property
+    def as_dict(self):
         """
-        Limit the tests run to the provided test_names list of names of test
-        functions or test classes.
+        Return a dictionary representation of the heap usage recorded.
         """
-        self._tests = [
-            t
-            for t in self._tests
-            if (t.test_name in test_names)
-            or (t.test_name.split(".")[0] in test_names)
-        ]
+        return {
+            "backend": self.backend,
+            "collect": self.collect,
+            "growths": [
+                {"node_id": node_id, "growth": growth}
+                for growth, node_id in self.growths
+            ],
+            "modules": self.modules,
+        }
 
-    async def print(self, text):
+
+class Reporter:
+    """
+    The base class of plugins that write a report of the test run to a file
+    as each test finishes, so the report is never held in memory (however
+    big the test suite).
+
+    The file is either the path of a file (e.g. on PyScript's virtual file
+    system), which is opened when the test run starts and closed when it
+    finishes, or an object with a write method (such as an open file), which
+    is left open.
+
+    Subclasses write each test in write_test(test_case), and may write
+    anything needed before the first test in start() or after the last test
+    in finish().
+    """
+
+    def __init__(self, file):
+        self.file = file
+        self._stream = None
+
+    def write(self, text):
         """
-        Print the provided text to the console.
+        Write the text to the report.
         """
-        if is_micropython:
-            # MicroPython doesn't flush.
-            print(text, end="")
+        self._stream.write(text)
+
+    def start(self):
+        pass
+
+    def write_test(self, test_case):
+        pass
+
+    def finish(self):
+        pass
+
+    def on_session_start(self, test_run):
+        if isinstance(self.file, str):
+            self._stream = open(self.file, "w")
         else:
-            if not RUNNING_IN_WORKER:
-                # Ensure print is non-blocking in Pyodide on main thread.
-                await asyncio.sleep(0)
-            print(text, end="", flush=True)
+            self._stream = self.file
+        self.start()
 
-    async def run(self, randomize=False):
-        """
-        Run each TestCase instance for this module. If a setup or teardown
-        exists, these will be evaluated immediately before and after the
-        TestCase is run.
+    def on_test_finish(self, test_case):
+        self.write_test(test_case)
 
-        Print a dot for each passing test, an F for each failing test, and an S
-        for each skipped test.
-        """
-        print(f"\n{self.path}: ", end="")
-        if randomize:
-            shuffle(self._tests)
-        for test_case in self.tests:
-            if self.setup:
-                if is_awaitable(self.setup):
-                    await self.setup()
-                else:
-                    self.setup()
-            await test_case.run()
-            if self.teardown:
-                if is_awaitable(self.teardown):
-                    await self.teardown()
-                else:
-                    self.teardown()
-            if test_case.status == SKIPPED:
-                await self.print("\033[33;1mS\033[0m")
-            elif test_case.status == PASS:
-                await self.print("\033[32;1m.\033[0m")
-            else:
-                await self.print("\033[31;1mF\033[0m")
+    def on_session_finish(self, test_run):
+        if self._stream is None:
+            return
+        try:
+            self.finish()
+        finally:
+            if self._stream is not self.file:
+                self._stream.close()
+            elif hasattr(self._stream, "flush"):
+                self._stream.flush()
+            self._stream = None
 
 
-def gather_conftest_functions(conftest_path, target):
+class JSONLinesReporter(Reporter):
     """
-    Import the conftest.py module from the given Path instance, and return the
-    global setup and teardown functions for the target (if they exist).
+    A plugin that writes the outcome of each test to a file, as soon as it
+    finishes, as a line of JSON: the dictionary representation of the
+    TestCase (see TestCase.as_dict).
     """
-    conftest_path = str(conftest_path)
-    if os.path.exists(conftest_path):
-        print(
-            f"Using \033[1m{conftest_path}\033[0m for global setup and teardown in \033[1m{target}\033[0m."
-        )
-        conftest = import_module(conftest_path)
-        setup = conftest.setup if hasattr(conftest, "setup") else None
-        teardown = conftest.teardown if hasattr(conftest, "teardown") else None
-        return setup, teardown
-    return None, None
 
+    def start(self):
+        import json
 
-def discover(targets, pattern, setup=None, teardown=None):
+        self._json = json
+
+    def write_test(self, test_case):
+        self.write(self._json.dumps(test_case.as_dict) + "\n")
+
+
+def _xml_escape(text):
     """
-    Return a list of TestModule instances representing Python modules
-    recursively found via the targets and, if a target is a directory, whose
-    module name matches the pattern for identifying test modules.
+    Return the text escaped for use in XML content or a (double quoted)
+    attribute. Control characters, which XML can't contain, are replaced
+    with "?".
+    """
+    text = (
+        str(text)
+        .replace("&", "&amp;")
+        .replace("<", "&lt;")
+        .replace(">", "&gt;")
+        .replace('"', "&quot;")
+    )
+    for character in text:
+        if character < " " and character not in "\t\n\r":
+            return "".join(
+                [
+                    "?" if c < " " and c not in "\t\n\r" else c
+                    for c in text
+                ]
+            )
+    return text
 
-    The targets may be simply a string describing the directory in
-    which to start looking for test modules (e.g. "./tests"), or strings
-    representing the names of specific test modules / tests to run (of the
-    form: "module_path" or "module_path::test_function" or
-    "module_path::test_function_1,test_function_2"; e.g. "tests/test_module.py"
-    or "tests/test_module.py::test_stuff" or
-    "tests/test_module.py::test_stuff,test_more_stuff").
 
-    If there is a conftest.py file in any of the specified directories
-    containing a test module, it will be imported for any global setup and
-    teardown functions to use for modules found within that directory. These
-    setup and teardown functions can be overridden in the individual test
-    modules.
+class JUnitXMLReporter(Reporter):
     """
-    result = []
-    for target in targets:
-        if "::" in target:
-            conftest_path = Path(target.split("::")[0]).parent / "conftest.py"
-            setup, teardown = gather_conftest_functions(conftest_path, target)
-            module_path, test_names = target.split("::")
-            module_instance = import_module(module_path)
-            module = TestModule(module_path, module_instance, setup, teardown)
-            module.limit_tests_to(test_names.split(","))
-            result.append(module)
-        elif os.path.isdir(target):
-            conftest_path = Path(target) / "conftest.py"
-            setup, teardown = gather_conftest_functions(conftest_path, target)
-            for module_path in Path(target).rglob(pattern):
-                module_instance = import_module(module_path)
-                module = TestModule(
-                    module_path, module_instance, setup, teardown
-                )
-                result.append(module)
+    A plugin that writes the outcome of each test to a file, as soon as it
+    finishes, as JUnit XML (as read by most CI services).
+
+    Each test module is a <testsuite>, within a single <testsuites> element.
+    Since the elements are written before the outcome of later tests is
+    known, they don't have the (optional) attributes counting the tests,
+    failures and so on: CI services count the <testcase> elements instead.
+    Failing tests have a <failure> element containing the traceback, tests
+    that timed out have a <failure> element with the reason, and skipped
+    tests have a <skipped> element. Tests that were not run are left out.
+    """
+
+    def __init__(self, file, name="upytest"):
+        super().__init__(file)
+        self.name = name
+        self._suite = None  # the path of the module of the open <testsuite>.
+
+    def start(self):
+        self._suite = None
+        self.write('<?xml version="1.0" encoding="utf-8"?>\n')
+        self.write(f'<testsuites name="{_xml_escape(self.name)}">\n')
+
+    def write_test(self, test_case):
+        module_path = test_case.module_name
+        if module_path != self._suite:
+            if self._suite is not None:
+                self.write("  </testsuite>\n")
+            self._suite = module_path
+            self.write(f'  <testsuite name="{_xml_escape(module_path)}">\n')
+        # E.g. "tests.test_module.TestClass" and "test_method[case]".
+        classname = module_name(module_path)
+        name = test_case.test_name
+        if "." in name.split("[")[0]:
+            class_name, name = name.split(".", 1)
+            classname = f"{classname}.{class_name}"
+        name = name or module_path
+        self.write(
+            f'    <testcase classname="{_xml_escape(classname)}" '
+            f'name="{_xml_escape(name)}" time="{test_case.duration:.6f}"'
+        )
+        status = test_case.status
+        if status == FAIL:
+            traceback = (test_case.traceback or "").strip()
+            message = traceback.split("\n")[-1]
+            self.write(
+                f'>\n      <failure message="{_xml_escape(message)}">'
+                f"{_xml_escape(traceback)}</failure>\n    </testcase>\n"
+            )
+        elif status == TIMEOUT:
+            self.write(
+                f'>\n      <failure type="timeout" '
+                f'message="{_xml_escape(test_case.reason)}" />\n'
+                "    </testcase>\n"
+            )
+        elif status == SKIPPED:
+            self.write(
+                f'>\n      <skipped message="{_xml_escape(test_case.reason)}"'
+                " />\n    </testcase>\n"
+            )
         else:
-            conftest_path = Path(target).parent / "conftest.py"
-            setup, teardown = gather_conftest_functions(conftest_path, target)
-            module_instance = import_module(target)
-            module = TestModule(target, module_instance, setup, teardown)
-            result.append(module)
-    return result
+            self.write(" />\n")
 
+    def finish(self):
+        if self._suite is not None:
+            self.write("  </testsuite>\n")
+        self.write("</testsuites>\n")
 
-class raises:
+
+class Benchmark:
     """
-    A context manager to ensure expected exceptions are raised.
+    Measures how long a test function takes to run, via the best available
+    clock (see timer).
+
+    The number of iterations per round is calibrated so a round takes at
+    least min_time seconds (so the resolution of the clock doesn't swamp the
+    measurement), then the test is run for warmup_rounds untimed rounds and
+    rounds timed rounds.
     """
 
-    def __init__(self, *expected_exceptions):
+    def __init__(
+        self, rounds=5, warmup_rounds=1, min_time=0.01, iterations=None
+    ):
         """
-        Pass in expected exception classes that should be raised within the
+        A Benchmark is instantiated with the number of timed and warmup
+        rounds, the minimum time, in seconds, of each round, and an optional
+        fixed number of iterations per round (to skip calibration).
+        """
+        if rounds < 1:
+            raise ValueError("There must be at least one round.")
+        self.rounds = rounds
+        self.warmup_rounds = warmup_rounds
+        self.min_time = min_time
+        self.iterations = iterations
+
+    async def _time_round(self, test_function, args, is_async, iterations):
+        """
+        Return the number of seconds taken to call the test function with the
+        args the given number of times.
+        """
+        start = timer()
+        if is_async:
+            for i in range(iterations):
+                await test_function(*args)
+        else:
+            for i in range(iterations):
+                test_function(*args)
+        return elapsed(start)
+
+    async def measure(self, test_function, args=(), is_async=False):
+        """
+        Run the benchmark of the test function, called with the args, and
+        return a dictionary of statistics about the time, in seconds, taken by
+        each call: "min", "max", "mean", "median" and "stddev", along with
+        "ops" (calls per second), "rounds" and "iterations" (per round).
+
+        Control is yielded to the event loop between rounds, so the page
+        stays responsive and a time limit can cancel the benchmark.
+        """
+        iterations = self.iterations
+        if iterations is None:
+            iterations = 1
+            while True:
+                duration = await self._time_round(
+                    test_function, args, is_async, iterations
+                )
+                if duration >= self.min_time or iterations >= 1 << 24:
+                    break
+                if duration > 0:
+                    # Aim just beyond the minimum time, at most 10x at once.
+                    estimate = int(iterations * self.min_time * 1.2 / duration)
+                    estimate = min(estimate, iterations * 10)
+                    iterations = max(iterations + 1, estimate)
+                else:
+                    iterations *= 10
+                await asyncio.sleep(0)
+        for i in range(self.warmup_rounds):
+            await self._time_round(test_function, args, is_async, iterations)
+            await asyncio.sleep(0)
+        timings = []
+        for i in range(self.rounds):
+            duration = await self._time_round(
+                test_function, args, is_async, iterations
+            )
+            timings.append(duration / iterations)
+            await asyncio.sleep(0)
+        timings.sort()
+        count = len(timings)
+        mean = sum(timings) / count
+        middle = count // 2
+        if count % 2:
+            median = timings[middle]
+        else:
+            median = (timings[middle - 1] + timings[middle]) / 2
+        stddev = 0
+        if count > 1:
+            variance = sum([(t - mean) ** 2 for t in timings]) / (count - 1)
+            stddev = variance**0.5
+        return {
+            "min": timings[0],
+            "max": timings[-1],
+            "mean": mean,
+            "median": median,
+            "stddev": stddev,
+            "ops": 1 / mean if mean else 0,
+            "rounds": count,
+            "iterations": iterations,
+        }
+
+
+class TestCase:
+    """
+    Represents an individual test to run.
+
+    Test suites may contain many thousands of tests, so instances use slots
+    (where supported by the interpreter) to minimise their memory footprint,
+    and everything that can be known about the test is worked out once, when
+    it is collected, rather than every time it is run.
+    """
+
+    __slots__ = (
+        "test_function",
+        "module_name",
+        "test_name",
+        "function_id",
+        "args",
+        "is_async",
+        "is_serial",
+        "is_skipped",
+        "timeout",
+        "status",
+        "exception",
+        "_traceback",
+        "setup_duration",
+        "call_duration",
+        "teardown_duration",
+        "reason",
+        "benchmark",
+    )
+
+    def __init__(self, test_function, module_name, test_name, function_id):
+        """
+        A TestCase is instantiated with a callable test_function, the name of
+        the module containing the test, the name of the test within the module
+        and the unique Python id of the test function.
+
+        The test_function may be None for a test that has been named (e.g. by
+        a Manifest) but whose module is yet to be imported.
+        """
+        self.test_function = test_function
+        self.module_name = str(module_name)
+        self.test_name = test_name
+        self.function_id = function_id
+        self.args = ()  # the arguments for a case of a parametrized test.
+        self.status = PENDING  # the initial state of the test.
+        # The time, in seconds, taken by each phase of running the test.
+        self.setup_duration = 0
+        self.call_duration = 0
+        self.teardown_duration = 0
+        self.exception = None  # to contain any exception raised by the test.
+        self._traceback = None  # to contain the formatted exception.
+        self.reason = None  # to contain the reason for skipping the test.
+        self.benchmark = None  # to contain the statistics of a benchmark.
+        # The time limit for the test, in seconds, or None for no limit.
+        self.timeout = None
+        # Whether the test is skipped is resolved when it is collected.
+        self.is_skipped = False
+        if test_function is None:
+            self.is_async = False
+            self.is_serial = False
+        else:
+            self.is_async = is_awaitable(test_function)
+            # Benchmarks are never overlapped, so they are timed in isolation.
+            self.is_serial = (
+                function_id in _SERIAL_TESTS or function_id in _BENCHMARKS
+            )
+            self.timeout = _registered_id(_TEST_TIMEOUTS, function_id)
+
+    def skip(self, reason):
+        """
+        Mark the test to be skipped, for the given reason, rather than run.
+        """
+        self.is_skipped = True
+        self.reason = reason or "No reason given."
+
+    @property
+    def can_run_concurrently(self):
+        """
+        Return a boolean indication if the test may overlap with other tests
+        when running in concurrent mode. Only async tests that are not marked
+        as serial can do so.
+        """
+        return self.is_async and not self.is_serial
+
+    @property
+    def duration(self):
+        """
+        Return the total time, in seconds, taken by the setup, call and
+        teardown phases of the test.
+        """
+        return (
+            self.setup_duration + self.call_duration + self.teardown_duration
+        )
+
+    @property
+    def node_id(self):
+        """
+        Return the unique identifier of the test, of the form
+        "module_path::test_name". (This is derived when needed, rather than
+        stored, since a string per test costs more memory than the slots save.)
+        """
+        if not self.test_name:
+            # The test stands in for a whole module that was skipped.
+            return self.module_name
+        return f"{self.module_name}::{self.test_name}"
+
+    async def run(self):
+        """
+        Run the test function and set the status and exception attributes, as
+        required. (The exception is formatted, as the traceback, and released
+        by format_traceback, which a TestModule calls as soon as the test has
+        finished.)
+
+        An async test that takes longer than its timeout is cancelled. A
+        synchronous test cannot be interrupted, so if it passes but takes
+        longer than its timeout, it is reported as timed out once it returns.
+
+        A benchmarked test is called repeatedly (see benchmark), and the
+        statistics of its timings are kept in the benchmark attribute.
+        """
+        if self.is_skipped:
+            self.status = SKIPPED
+            return
+        start = timer()
+        # Whether the test was awaited via asyncio.wait_for, which raises
+        # asyncio.TimeoutError if the time limit is reached.
+        limited = False
+        try:
+            benchmark = _registered_id(_BENCHMARKS, self.function_id)
+            if benchmark is not None:
+                measure = benchmark.measure(
+                    self.test_function, self.args, self.is_async
+                )
+                if self.timeout is None:
+                    self.benchmark = await measure
+                else:
+                    limited = True
+                    self.benchmark = await asyncio.wait_for(
+                        measure, self.timeout
+                    )
+            elif self.is_async:
+                if self.timeout is None:
+                    await self.test_function(*self.args)
+                else:
+                    limited = True
+                    await asyncio.wait_for(
+                        self.test_function(*self.args), self.timeout
+                    )
+            else:
+                self.test_function(*self.args)
+            self.status = PASS
+        except Exception as ex:
+            # A TimeoutError raised by the test itself (rather than by
+            # wait_for, once the time limit was reached) is a failure.
+            # (MicroPython's asyncio schedules to the millisecond, so the
+            # limit may be reached up to a millisecond early.)
+            if (
+                limited
+                and isinstance(ex, asyncio.TimeoutError)
+                and elapsed(start) >= self.timeout - 0.001
+            ):
+                self.status = TIMEOUT
+            else:
+                self.status = FAIL
+                self.exception = ex
+        self.call_duration = elapsed(start)
+        if self.timeout is not None and self.call_duration > self.timeout:
+            if self.status == PASS:
+                self.status = TIMEOUT
+        if self.status == TIMEOUT:
+            self.reason = (
+                f"Timed out after {self.call_duration:.3f} seconds "
+                f"(limit: {self.timeout} seconds)."
+            )
+
+    def format_traceback(self, traceback_format=_DEFAULT_TRACEBACK_FORMAT):
+        """
+        Format the traceback of the exception that made the test fail (unless
+        it has been already) via the given TracebackFormat, then release the
+        exception. (The format is given, rather than kept by each test, since
+        it is the same for every test in a test run.)
+        """
+        if self.exception is not None:
+            self._traceback = traceback_format.format(self.exception)
+            self.exception = None
+
+    @property
+    def traceback(self):
+        """
+        Return the formatted traceback of the exception that made the test
+        fail (see format_traceback), or None if the test did not fail.
+        """
+        self.format_traceback()
+        return self._traceback
+
+    @property
+    def as_dict(self):
+        """
+        Return a dictionary representation of the test case.
+        """
+        return {
+            "node_id": self.node_id,
+            "module_name": self.module_name,
+            "test_name": self.test_name,
+            "status": self.status,
+            "duration": self.duration,
+            "setup_duration": self.setup_duration,
+            "call_duration": self.call_duration,
+            "teardown_duration": self.teardown_duration,
+            "traceback": self.traceback,
+            "reason": self.reason,
+            "benchmark": self.benchmark,
+        }
+
+
+class Param:
+    """
+    The values of one case of a parametrized test, along with its optional
+    id, markers and reason to skip it (see param).
+    """
+
+    __slots__ = ("values", "id", "markers", "skip")
+
+    def __init__(self, values, id=None, markers=(), skip=None):
+        self.values = values
+        self.id = id
+        self.markers = tuple(markers)
+        self.skip = skip
+
+
+def case_id_part(argname, value, index):
+    """
+    Return the part of the id of the index-th case of a parametrized test that
+    describes the value of the named argument: the value itself if it is
+    simple enough, otherwise the argument name and index (e.g. "data3").
+    """
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return str(value)
+    return f"{argname}{index}"
+
+
+class ParametrizedTest:
+    """
+    Represents a test function that is run once for each of its cases (see
+    parametrize).
+
+    Each selected case only becomes a TestCase, named with the id of the
+    case (e.g. "test_add[3-4]"), when it is about to run. The cases may come
+    from a function (such as a generator function) called whenever they are
+    needed, so a large table of cases is never held in memory as TestCases.
+
+    The test_function may be None for a parametrized test that has been
+    indexed (e.g. by a Manifest) but whose module is yet to be imported, in
+    which case a case_index, listing the id and markers of each case, must
+    be given instead.
+    """
+
+    __slots__ = (
+        "test_function",
+        "module_name",
+        "test_name",
+        "function_id",
+        "argnames",
+        "cases",
+        "ids",
+        "markers",
+        "selection",
+        "selected",
+        "timeout",
+        "skip_reason",
+        "_count",
+    )
+
+    def __init__(
+        self,
+        test_function,
+        module_name,
+        test_name,
+        function_id,
+        markers=(),
+        selection=None,
+        case_index=None,
+    ):
+        self.test_function = test_function
+        self.module_name = str(module_name)
+        self.test_name = test_name
+        self.function_id = function_id
+        self.markers = markers
+        # Only the cases selected by the Selection and, if it isn't None, with
+        # node ids in the selected collection, are run.
+        self.selection = selection
+        self.selected = None
+        self.timeout = None
+        # The reason every case is skipped (see skip), or None.
+        self.skip_reason = None
+        self._count = None
+        if test_function is None:
+            self.argnames = ()
+            self.cases = case_index
+            self.ids = None
+        else:
+            self.argnames, self.cases, self.ids = _registered(
+                _PARAMETRIZED_TESTS, test_function
+            )
+            self.timeout = _registered(_TEST_TIMEOUTS, test_function)
+            self.skip_reason = _registered(_SKIPPED_TESTS, test_function)
+
+    def _iter_cases(self):
+        """
+        Yield a (case_id, args, markers, skip) tuple for every case, whether
+        or not it is selected.
+        """
+        if self.test_function is None:
+            for case_id, markers in self.cases:
+                yield case_id, (), tuple(markers), None
+            return
+        cases = self.cases
+        if callable(cases):
+            cases = cases()
+        elif not isinstance(cases, (list, tuple)):
+            # A generator or other iterator can only be consumed once.
+            cases = self.cases = list(cases)
+        argnames = self.argnames
+        index = 0
+        for case in cases:
+            case_id = None
+            markers = self.markers
+            skip = None
+            if isinstance(case, Param):
+                values = case.values
+                case_id = case.id
+                markers = markers + case.markers
+                skip = case.skip
+            elif len(argnames) == 1:
+                values = (case,)
+            else:
+                values = tuple(case)
+            if len(values) != len(argnames):
+                raise ValueError(
+                    f"Case {index} of {self.test_name} has {len(values)} "
+                    f"values for {len(argnames)} arguments."
+                )
+            if case_id is None:
+                if self.ids is None:
+                    case_id = "-".join(
+                        [
+                            case_id_part(argnames[i], values[i], index)
+                            for i in range(len(values))
+                        ]
+                    )
+                elif callable(self.ids):
+                    case_id = str(self.ids(*values))
+                else:
+                    case_id = str(self.ids[index])
+            yield case_id, values, markers, skip
+            index += 1
+
+    def _selects(self, node_id, test_name, markers):
+        """
+        Return a boolean indication if the case with the given node id, name
+        and markers is selected.
+        """
+        if self.selected is not None and node_id not in self.selected:
+            return False
+        if self.selection is None:
+            return True
+        return self.selection.selects(self.module_name, test_name, markers)
+
+    def node_ids(self):
+        """
+        Yield the node id of each selected case.
+        """
+        for case_id, args, markers, skip in self._iter_cases():
+            test_name = f"{self.test_name}[{case_id}]"
+            node_id = f"{self.module_name}::{test_name}"
+            if self._selects(node_id, test_name, markers):
+                yield node_id
+
+    @property
+    def count(self):
+        """
+        Return the number of selected cases.
+        """
+        if self._count is None:
+            self._count = 0
+            for node_id in self.node_ids():
+                self._count += 1
+        return self._count
+
+    def limit_to_node_ids(self, node_ids):
+        """
+        Limit the cases run to those whose node id is in the provided
+        collection of node ids.
+        """
+        if self.selected is None:
+            self.selected = node_ids
+        else:
+            self.selected = set(
+                [node_id for node_id in self.selected if node_id in node_ids]
+            )
+        self._count = None
+
+    def case_index(self):
+        """
+        Return a list of the id and markers of every case, whether or not it
+        is selected.
+        """
+        return [
+            (case_id, markers)
+            for case_id, args, markers, skip in self._iter_cases()
+        ]
+
+    def iter_test_cases(self):
+        """
+        Yield a TestCase for each selected case, as it is needed.
+        """
+        for case_id, args, markers, skip in self._iter_cases():
+            test_name = f"{self.test_name}[{case_id}]"
+            node_id = f"{self.module_name}::{test_name}"
+            if not self._selects(node_id, test_name, markers):
+                continue
+            test_case = TestCase(
+                self.test_function,
+                self.module_name,
+                test_name,
+                self.function_id,
+            )
+            test_case.args = args
+            test_case.timeout = self.timeout
+            if self.skip_reason is not None:
+                test_case.skip(self.skip_reason)
+            elif skip is not None:
+                test_case.skip(skip)
+            yield test_case
+
+
+class KeywordExpression:
+    """
+    A boolean expression of words combined with "and", "or", "not" and
+    parentheses (e.g. "slow and not (network or dom)"), parsed once and then
+    evaluated against the words describing each test.
+
+    If exact is True, a word in the expression matches only an identical word
+    describing the test (as for markers). Otherwise, it matches if it is a
+    case-insensitive substring of any of them (as for test names).
+    """
+
+    def __init__(self, expression, exact=False):
+        """
+        A KeywordExpression is instantiated with the expression to parse. A
+        ValueError is raised if the expression is not valid.
+        """
+        self.expression = expression
+        self.exact = exact
+        tokens = expression.replace("(", " ( ").replace(")", " ) ").split()
+        self._tokens = tokens
+        self._position = 0
+        if not tokens:
+            raise ValueError(f"Empty expression: {expression!r}")
+        self._evaluate = self._parse_or()
+        if self._position != len(tokens):
+            self._error()
+        del self._tokens
+
+    def _error(self):
+        raise ValueError(f"Invalid expression: {self.expression!r}")
+
+    def _next(self):
+        """
+        Return the next token, or None if there are none left.
+        """
+        if self._position < len(self._tokens):
+            return self._tokens[self._position]
+        return None
+
+    def _parse_or(self):
+        left = self._parse_and()
+        while self._next() == "or":
+            self._position += 1
+            right = self._parse_and()
+            left = self._either(left, right)
+        return left
+
+    def _parse_and(self):
+        left = self._parse_not()
+        while self._next() == "and":
+            self._position += 1
+            right = self._parse_not()
+            left = self._both(left, right)
+        return left
+
+    def _parse_not(self):
+        token = self._next()
+        if token is None or token in ("and", "or", ")"):
+            self._error()
+        self._position += 1
+        if token == "not":
+            operand = self._parse_not()
+            return lambda words: not operand(words)
+        if token == "(":
+            result = self._parse_or()
+            if self._next() != ")":
+                self._error()
+            self._position += 1
+            return result
+        return self._word(token)
+
+    def _either(self, left, right):
+        return lambda words: left(words) or right(words)
+
+    def _both(self, left, right):
+        return lambda words: left(words) and right(words)
+
+    def _word(self, token):
+        if self.exact:
+            return lambda words: token in words
+        token = token.lower()
+        return lambda words: any(token in word for word in words)
+
+    def matches(self, words):
+        """
+        Return a boolean indication if the expression is true for the given
+        words describing a test.
+        """
+        if not self.exact:
+            words = [word.lower() for word in words]
+        return self._evaluate(words)
+
+
+class Selection:
+    """
+    Decides which tests are selected to run, given only their module path,
+    name and markers, so deselected tests are never instantiated as
+    TestCases (and, with a Manifest, modules without any selected tests are
+    never imported).
+
+    Tests may be selected by a list of names of test functions, test classes
+    or cases of parametrized tests (e.g. "test_add[3-4]"), by a keyword
+    expression matched against the name of the test module, the parts of
+    the test name and the test's markers, and by a marker expression matched
+    against the test's markers.
+    """
+
+    def __init__(self, keyword=None, marker=None, names=None):
+        """
+        A Selection is instantiated with optional keyword and marker
+        expressions (strings or KeywordExpression instances) and an optional
+        list of names of test functions or test classes.
+        """
+        if isinstance(keyword, str):
+            keyword = KeywordExpression(keyword)
+        if isinstance(marker, str):
+            marker = KeywordExpression(marker, exact=True)
+        self.keyword = keyword
+        self.marker = marker
+        self.names = set(names) if names is not None else None
+
+    def with_names(self, names):
+        """
+        Return a new Selection that also limits the tests to the given list of
+        names of test functions or test classes.
+        """
+        return Selection(self.keyword, self.marker, names)
+
+    def selects(self, module_path, test_name, markers):
+        """
+        Return a boolean indication if the test with the given name and tuple
+        of markers, in the module at module_path, is selected.
+        """
+        if self.names is not None and test_name not in self.names:
+            if test_name.split(".")[0] not in self.names:
+                if test_name.split("[")[0] not in self.names:
+                    return False
+        if self.marker and not self.marker.matches(markers):
+            return False
+        if self.keyword:
+            words = [module_path.rsplit("/", 1)[-1]]
+            words.extend(test_name.split("."))
+            words.extend(markers)
+            if not self.keyword.matches(words):
+                return False
+        return True
+
+
+class TestModule:
+    """
+    Represents a module containing tests.
+    """
+
+    __slots__ = (
+        "path",
+        "module",
+        "_setup",
+        "_teardown",
+        "_setup_is_async",
+        "_teardown_is_async",
+        "_setup_module",
+        "_teardown_module",
+        "_tests",
+        "_stopped",
+        "_pending",
+        "_unfinished",
+        "_hooks",
+        "_traceback_format",
+        "imported",
+        "reason",
+        "selection",
+        "_priority",
+    )
+
+    def __init__(
+        self,
+        path,
+        module,
+        setup=None,
+        teardown=None,
+        test_index=None,
+        selection=None,
+    ):
+        """
+        A TestModule is instantiated with a path to its location on the
+        filesystem and an object representing the Python module itself.
+
+        Optional global setup and teardown callables may also be supplied. If
+        the module already contains valid setup/teardown functions, these will
+        be used instead.
+
+        If the module is None, the index of the tests it contains (a list of
+        [test_name, markers] pairs, with a third item listing the [case_id,
+        markers] of each case of a parametrized test) may be given instead
+        (e.g. from a Manifest). The module is then only imported when its
+        tests are run, so modules whose tests are all deselected are never
+        imported. Otherwise, the module must be loaded before its tests are
+        run.
+
+        If a Selection is given, only the tests it selects are instantiated.
+        """
+        self.path = str(path)
+        self.module = None
+        self._setup = setup
+        self._teardown = teardown
+        self._setup_module = None
+        self._teardown_module = None
+        self._tests = None
+        self._stopped = False
+        self._pending = None  # to iterate the tests while they're run.
+        self._unfinished = []  # the tests taken from _pending but not run.
+        self._hooks = _NO_HOOKS  # the hooks of the plugins of the test run.
+        # How the tracebacks of failing tests are formatted.
+        self._traceback_format = _DEFAULT_TRACEBACK_FORMAT
+        # The names of the modules added to sys.modules by importing this one
+        # (only recorded when test modules are isolated, see unload_modules).
+        self.imported = ()
+        # The reason the whole module was skipped (see skip_module), or None.
+        self.reason = None
+        # The node ids of the tests to run first (see prioritize), or None.
+        self._priority = None
+        # The Selection of the tests to run (also applied if the module is
+        # only imported when its tests are run), or None for every test.
+        self.selection = selection
+        if module is not None:
+            self.load(module, selection)
+        elif test_index is not None:
+            self._tests = []
+            for entry in test_index:
+                name, markers = entry[0], entry[1]
+                if len(entry) > 2:
+                    t = ParametrizedTest(
+                        None,
+                        self.path,
+                        name,
+                        None,
+                        tuple(markers),
+                        selection,
+                        entry[2],
+                    )
+                    if t.count:
+                        self._tests.append(t)
+                elif selection is None or selection.selects(
+                    self.path, name, markers
+                ):
+                    self._tests.append(TestCase(None, self.path, name, None))
+            self._classify_setup_teardown()
+
+    @property
+    def is_loaded(self):
+        """
+        Return a boolean indication if the Python module has been imported and
+        its tests harvested (or was skipped while being imported).
+        """
+        return self.module is not None or self.reason is not None
+
+    def skip(self, reason):
+        """
+        Skip the whole module, for the given reason, because it called
+        skip_module while being imported. It is then represented by a single
+        skipped TestCase, named after the module.
+        """
+        self.reason = reason or "No reason given."
+        test_case = TestCase(None, self.path, "", None)
+        test_case.skip(self.reason)
+        self._tests = [test_case]
+        self._setup = self._teardown = None
+        self._setup_module = self._teardown_module = None
+
+    def load(self, module, selection=None):
+        """
+        Harvest references to test functions, setup and teardown from the
+        given Python module. If tests were previously named without importing
+        the module, only the tests with those names are retained. If a
+        Selection is given, only the tests it selects are instantiated.
+
+        Return the index of the tests found in the module, whether or not
+        they were selected: a list of (test_name, markers, case_index)
+        tuples, where case_index is None or, for a parametrized test, a
+        function returning the id and markers of each of its cases.
+        """
+        self.selection = selection
+        selected = None
+        # The node ids to which the cases of parametrized tests were limited
+        # (e.g. by sharding), by name. The cases indexed by a manifest are
+        # not a limit, since they may come from a function whose results
+        # have changed since, so they are found afresh.
+        selected_cases = {}
+        if self._tests is not None:
+            selected = set([t.test_name for t in self._tests])
+            for t in self._tests:
+                if isinstance(t, ParametrizedTest) and t.selected is not None:
+                    selected_cases[t.test_name] = t.selected
+        self.module = module
+        self._tests = []
+        index = []
+        local_setup_teardown = False
+        # Harvest references to test functions, setup and teardown. Check the
+        # (cheap) name before the (potentially expensive) type of each item.
+        for name, item in self.module.__dict__.items():
+            if name.startswith("test"):
+                if selected is not None and name not in selected:
+                    continue
+                if callable(item) or is_awaitable(item):
+                    markers = _registered(_TEST_MARKERS, item, ())
+                    if _registered(_PARAMETRIZED_TESTS, item):
+                        # A test function run once for each of its cases.
+                        t = ParametrizedTest(
+                            item, self.path, name, id(item), markers, selection
+                        )
+                        index.append((name, markers, t.case_index))
+                        if name in selected_cases:
+                            t.limit_to_node_ids(selected_cases[name])
+                        if t.count:
+                            self._tests.append(t)
+                        continue
+                    # A simple test function.
+                    index.append((name, markers, None))
+                    if selection and not selection.selects(
+                        self.path, name, markers
+                    ):
+                        continue
+                    t = TestCase(item, self.path, name, id(item))
+                    reason = _registered(_SKIPPED_TESTS, item)
+                    if reason is not None:
+                        t.skip(reason)
+                    self._tests.append(t)
+            elif name.startswith("Test") and isinstance(item, type):
+                # A test class, so check for test methods.
+                instance = None
+                class_markers = _registered(_TEST_MARKERS, item, ())
+                for method_name, method in item.__dict__.items():
+                    if not method_name.startswith("test"):
+                        continue
+                    test_name = f"{name}.{method_name}"
+                    if selected is not None and test_name not in selected:
+                        continue
+                    if callable(method) or is_awaitable(method):
+                        markers = class_markers + _registered(
+                            _TEST_MARKERS, method, ()
+                        )
+                        if _registered(_PARAMETRIZED_TESTS, method):
+                            t = ParametrizedTest(
+                                method,
+                                self.path,
+                                test_name,
+                                id(method),
+                                markers,
+                                selection,
+                            )
+                            index.append((test_name, markers, t.case_index))
+                            if test_name in selected_cases:
+                                t.limit_to_node_ids(selected_cases[test_name])
+                            if t.count:
+                                if instance is None:
+                                    instance = item()
+                                t.test_function = getattr(
+                                    instance, method_name
+                                )
+                                self._tests.append(t)
+                            continue
+                        index.append((test_name, markers, None))
+                        if selection and not selection.selects(
+                            self.path, test_name, markers
+                        ):
+                            continue
+                        if instance is None:
+                            instance = item()
+                        t = TestCase(
+                            getattr(instance, method_name),
+                            self.path,
+                            test_name,
+                            id(method),
+                        )
+                        reason = _registered(_SKIPPED_TESTS, method)
+                        if reason is not None:
+                            t.skip(reason)
+                        self._tests.append(t)
+            elif name == "setup" and callable(item):
+                # A local setup function.
+                self._setup = item
+                local_setup_teardown = True
+            elif name == "teardown" and callable(item):
+                # A local teardown function.
+                self._teardown = item
+                local_setup_teardown = True
+            elif name == "setup_module" and callable(item):
+                # Called once, before any of the module's tests.
+                self._setup_module = item
+            elif name == "teardown_module" and callable(item):
+                # Called once, after all of the module's tests.
+                self._teardown_module = item
+        self._classify_setup_teardown()
+        if local_setup_teardown:
+            print(
+                f"Using \033[1mlocal\033[0m setup and teardown for \033[1m{self.path}\033[0m."
+            )
+        return index
+
+    def _classify_setup_teardown(self):
+        """
+        Work out, once, if the setup and teardown functions are awaitable.
+        """
+        self._setup_is_async = bool(self._setup) and is_awaitable(self._setup)
+        self._teardown_is_async = bool(self._teardown) and is_awaitable(
+            self._teardown
+        )
+
+    @property
+    def tests(self):
+        """
+        Return a list containing TestCase instances drawn from the
+        content of the test module, and ParametrizedTest instances that each
+        expand into a TestCase per case as they are run (see iter_tests).
+        """
+        return self._tests
+
+    @property
+    def test_count(self):
+        """
+        Return the number of tests to run, counting each selected case of a
+        parametrized test.
+        """
+        count = 0
+        for t in self._tests:
+            if isinstance(t, ParametrizedTest):
+                count += t.count
+            else:
+                count += 1
+        return count
+
+    def node_ids(self):
+        """
+        Yield the node id of each test to run, including each selected case
+        of a parametrized test (without instantiating them as TestCases).
+        """
+        for t in self._tests:
+            if isinstance(t, ParametrizedTest):
+                for node_id in t.node_ids():
+                    yield node_id
+            else:
+                yield t.node_id
+
+    def iter_tests(self):
+        """
+        Yield each TestCase to run, expanding the cases of parametrized tests
+        into TestCases one at a time.
+        """
+        for t in self._tests:
+            if isinstance(t, ParametrizedTest):
+                for test_case in t.iter_test_cases():
+                    yield test_case
+            else:
+                yield t
+
+    def unfinished_tests(self):
+        """
+        Yield each TestCase that was not run, because the test run stopped
+        before (or while) the module was run.
+        """
+        if self._pending is None:
+            self._pending = self.iter_tests()
+        for test_case in self._unfinished:
+            if test_case.status == PENDING:
+                yield test_case
+        for test_case in self._pending:
+            yield test_case
+
+    @property
+    def setup(self):
+        """
+        Get the setup function for the module.
+        """
+        return self._setup
+
+    @property
+    def teardown(self):
+        """
+        Get the teardown function for the module.
+        """
+        return self._teardown
+
+    def limit_tests_to_node_ids(self, node_ids):
+        """
+        Limit the tests run to those whose node id is in the provided
+        collection of node ids.
+        """
+        tests = []
+        for t in self._tests:
+            if isinstance(t, ParametrizedTest):
+                t.limit_to_node_ids(node_ids)
+                if t.count:
+                    tests.append(t)
+            elif t.node_id in node_ids:
+                tests.append(t)
+        self._tests = tests
+
+    def prioritize(self, node_ids):
+        """
+        Move the tests whose node id is in the provided collection of node ids
+        (or, for a parametrized test, any of whose cases have such a node id)
+        to the front of the tests to run, otherwise keeping the order of the
+        tests. Return True if any tests were moved.
+
+        The tests stay at the front when the module is run, even if it is
+        imported (so its tests are harvested afresh) or its tests are
+        shuffled first.
+        """
+        self._priority = node_ids
+        first = []
+        rest = []
+        for t in self._tests:
+            if isinstance(t, ParametrizedTest):
+                moved = [n for n in t.node_ids() if n in node_ids]
+            else:
+                moved = t.node_id in node_ids
+            if moved:
+                first.append(t)
+            else:
+                rest.append(t)
+        if first:
+            self._tests = first + rest
+        return bool(first)
+
+    async def print(self, text):
+        """
+        Print the provided text to the console, via the shared buffered
+        output, yielding to the event loop if the current time slice is over.
+        """
+        output.write(text)
+        await output.tick()
+
+    async def run(
+        self,
+        randomize=False,
+        concurrency=1,
+        on_result=None,
+        timeout=None,
+        traceback_format=None,
+        hooks=None,
+    ):
+        """
+        Run each TestCase instance for this module. If a setup or teardown
+        exists, these will be evaluated immediately before and after the
+        TestCase is run. If a setup_module or teardown_module exists, these
+        will be evaluated once, before the first and after the last TestCase
+        is run (teardown_module is evaluated even if the tests fail). If
+        setup_module fails, all the tests fail with its error.
+
+        If concurrency is greater than one, consecutive async tests that are
+        not marked as serial are run together, with at most concurrency of
+        them overlapping at any one time. Each test is still wrapped in its own
+        setup and teardown.
+
+        Print a dot for each passing test, an F for each failing test, an S
+        for each skipped test and a T for each test that timed out. If an
+        on_result coroutine function is given, it
+        is awaited with each TestCase once it has finished.
+
+        If a timeout (in seconds) is given, it applies to each test that
+        doesn't have its own time limit. If a TracebackFormat is given, it is
+        used to format the traceback of each failing test. If Hooks are given,
+        they are called as each test starts and finishes, and around its
+        setup and teardown.
+        """
+        # Ensure anything printed while loading the module appears after the
+        # progress of earlier modules.
+        output.flush()
+        if self.tests and not self.is_loaded:
+            try:
+                self.load(import_module(self.path), self.selection)
+            except ModuleSkipped as ex:
+                forget_tests([module_name(self.path)])
+                self.skip(ex.args[0] if ex.args else "")
+        output.write(f"\n{self.path}: ")
+        if randomize:
+            shuffle(self._tests)
+        if self._priority:
+            self.prioritize(self._priority)
+        if timeout is not None:
+            for test_case in self._tests:
+                if test_case.timeout is None:
+                    test_case.timeout = timeout
+        if traceback_format is not None:
+            self._traceback_format = traceback_format
+        self._stopped = False
+        self._hooks = hooks or _NO_HOOKS
+        if not self.tests:
+            return
+        self._pending = self.iter_tests()
+        if self._hooks.on_module_start:
+            self._hooks.on_module_start(self)
+        try:
+            await self._run_module(concurrency, on_result)
+        finally:
+            if self._hooks.on_module_finish:
+                self._hooks.on_module_finish(self)
+
+    async def _run_module(self, concurrency, on_result):
+        """
+        Run the tests, wrapped in the module's setup_module and
+        teardown_module.
+        """
+        # There's no need for module fixtures if every test is skipped.
+        use_fixtures = not all(
+            isinstance(t, TestCase) and t.is_skipped for t in self._tests
+        )
+        if self._setup_module and use_fixtures:
+            try:
+                await call_fixture(self._setup_module)
+            except Exception as ex:
+                # None of the tests can run, so they all fail with the error
+                # (unless they were skipped anyway).
+                for test_case in self._pending:
+                    if self._hooks.on_test_start:
+                        self._hooks.on_test_start(test_case)
+                    if test_case.is_skipped:
+                        test_case.status = SKIPPED
+                    else:
+                        test_case.status = FAIL
+                        test_case.exception = ex
+                    await self.report(test_case, on_result)
+                    if self._stopped:
+                        break
+                return
+        try:
+            await self._run_tests(concurrency, on_result)
+        finally:
+            if self._teardown_module and use_fixtures:
+                try:
+                    await call_fixture(self._teardown_module)
+                except Exception as ex:
+                    print_fixture_error("teardown_module", self.path, ex)
+
+    async def _run_tests(self, concurrency, on_result):
+        """
+        Run the tests, overlapping async tests if the concurrency is greater
+        than one, until they're all run or the test run has stopped.
+        """
+        batch = []
+        for test_case in self._pending:
+            if self._stopped:
+                batch.append(test_case)
+                break
+            if concurrency > 1 and test_case.can_run_concurrently:
+                batch.append(test_case)
+                continue
+            if batch:
+                await self.run_concurrently(batch, concurrency, on_result)
+                if self._stopped:
+                    batch.append(test_case)
+                    break
+                batch = []
+            await self.run_test(test_case, on_result)
+        if batch and not self._stopped:
+            await self.run_concurrently(batch, concurrency, on_result)
+        # Remember the tests taken from the pending tests, in case any of them
+        # were not run because the test run stopped.
+        self._unfinished = batch
+
+    async def run_concurrently(self, test_cases, concurrency, on_result=None):
+        """
+        Run the given test cases with a pool of at most concurrency workers,
+        each of which takes the next test case from a shared iterator. (This
+        bounds the number of overlapping tests in the same way as a semaphore,
+        which MicroPython's asyncio does not provide.)
+        """
+        pending = iter(test_cases)
+
+        async def worker():
+            for test_case in pending:
+                if self._stopped:
+                    break
+                await self.run_test(test_case, on_result)
+
+        workers = min(concurrency, len(test_cases))
+        await asyncio.gather(*[worker() for _ in range(workers)])
+
+    async def run_test(self, test_case, on_result=None):
+        """
+        Run a single TestCase, wrapped in the module's setup and teardown, then
+        print and report its outcome.
+        """
+        hooks = self._hooks
+        if hooks.on_test_start:
+            hooks.on_test_start(test_case)
+        if test_case.is_skipped:
+            # Skipped tests don't pay for setup or teardown.
+            test_case.status = SKIPPED
+            await self.report(test_case, on_result)
+            return
+        if self._setup:
+            if hooks.on_setup_start:
+                hooks.on_setup_start(test_case)
+            start = timer()
+            if self._setup_is_async:
+                await self._setup()
+            else:
+                self._setup()
+            test_case.setup_duration = elapsed(start)
+            if hooks.on_setup_finish:
+                hooks.on_setup_finish(test_case)
+        await test_case.run()
+        if self._teardown:
+            if hooks.on_teardown_start:
+                hooks.on_teardown_start(test_case)
+            start = timer()
+            if self._teardown_is_async:
+                await self._teardown()
+            else:
+                self._teardown()
+            test_case.teardown_duration = elapsed(start)
+            if hooks.on_teardown_finish:
+                hooks.on_teardown_finish(test_case)
+        await self.report(test_case, on_result)
+
+    async def report(self, test_case, on_result=None):
+        """
+        Print the outcome of the finished TestCase and, if given, await the
+        on_result coroutine function with it.
+        """
+        # Release the exception (and the frames it refers to) straight away.
+        test_case.format_traceback(self._traceback_format)
+        if self._hooks.on_test_finish:
+            self._hooks.on_test_finish(test_case)
+        if test_case.status == SKIPPED:
+            await self.print("\033[33;1mS\033[0m")
+        elif test_case.status == PASS:
+            await self.print("\033[32;1m.\033[0m")
+        elif test_case.status == TIMEOUT:
+            await self.print("\033[31;1mT\033[0m")
+        else:
+            await self.print("\033[31;1mF\033[0m")
+        if on_result:
+            if await on_result(test_case):
+                self._stopped = True
+
+
+def _exists(path):
+    """
+    Return True if a file or directory exists at the path.
+    """
+    try:
+        os.stat(path)
+        return True
+    except OSError:
+        return False
+
+
+def _is_directory(path):
+    """
+    Return True if the path is that of a directory.
+    """
+    try:
+        return bool(os.stat(path)[0] & 0x4000)  # stat.S_IFDIR
+    except OSError:
+        return False
+
+
+def _normalize_path(path):
+    """
+    Return the path without any leading "./" or trailing "/", so the same
+    directory or module is always described in the same way.
+    """
+    path = normalize_node_id(path)
+    if len(path) > 1:
+        path = path.rstrip("/")
+    return path or "."
+
+
+def _join_path(directory, name):
+    """
+    Return the path of the named file or directory in the directory.
+    """
+    directory = _normalize_path(directory)
+    if directory == ".":
+        return name
+    return directory.rstrip("/") + "/" + name
+
+
+def _parent_path(path):
+    """
+    Return the path of the directory containing the file or directory at path.
+    """
+    path = _normalize_path(path)
+    if "/" not in path:
+        return "."
+    return path.rsplit("/", 1)[0] or "/"
+
+
+def _in_character_class(character, members):
+    """
+    Return True if the character is one of the members of a glob's character
+    class (the part between "[" and "]"), which may include ranges like "a-z".
+    """
+    i = 0
+    while i < len(members):
+        if i + 2 < len(members) and members[i + 1] == "-":
+            if members[i] <= character <= members[i + 2]:
+                return True
+            i += 3
+        else:
+            if character == members[i]:
+                return True
+            i += 1
+    return False
+
+
+def _compile_glob(pattern):
+    """
+    Return a function that returns True if the name passed to it matches the
+    glob pattern, which may contain "*", "?" and "[...]" wildcards (MicroPython
+    has no fnmatch module).
+
+    The pattern is parsed once, into the parts between its "*" wildcards.
+    Each part is a string (if it contains no other wildcards) or a list of
+    items, each matching one character: a string for a literal character,
+    None for "?" and a (members, negate) tuple for a character class. Every
+    name is then matched without backtracking, by finding each part at the
+    earliest position after the part before it.
+    """
+    parts = []
+    items = []
+    i = 0
+    while i < len(pattern):
+        character = pattern[i]
+        i += 1
+        if character == "*":
+            parts.append(items)
+            items = []
+        elif character == "?":
+            items.append(None)
+        elif character == "[":
+            negate = pattern[i : i + 1] == "!"
+            start = i + 1 if negate else i
+            # A "]" straight after the "[" (or "[!") is one of the members.
+            end = pattern.find("]", start + 1)
+            if end == -1:
+                items.append(character)
+            else:
+                items.append((pattern[start:end], negate))
+                i = end + 1
+        else:
+            items.append(character)
+    parts.append(items)
+    parts = [
+        "".join(part) if all([isinstance(x, str) for x in part]) else part
+        for part in parts
+    ]
+
+    def part_matches(part, name, position):
+        if isinstance(part, str):
+            return name.startswith(part, position)
+        for offset, item in enumerate(part):
+            character = name[position + offset]
+            if item is None:
+                continue
+            if isinstance(item, str):
+                if character != item:
+                    return False
+            elif _in_character_class(character, item[0]) == item[1]:
+                return False
+        return True
+
+    first = parts[0]
+    last = parts[-1]
+
+    def matches(name):
+        if len(parts) == 1:
+            return len(name) == len(first) and part_matches(first, name, 0)
+        end = len(name) - len(last)
+        if end < len(first):
+            return False
+        if not (
+            part_matches(first, name, 0) and part_matches(last, name, end)
+        ):
+            return False
+        position = len(first)
+        for part in parts[1:-1]:
+            while position + len(part) <= end:
+                if part_matches(part, name, position):
+                    break
+                position += 1
+            else:
+                return False
+            position += len(part)
+        return True
+
+    return matches
+
+
+if hasattr(os, "ilistdir"):
+    # MicroPython: entries are (name, type, inode[, size]) tuples.
+
+    def _list_directory(path):
+        """
+        Return a list of (name, is_directory) tuples for the entries in the
+        directory at path.
+        """
+        result = []
+        for entry in os.ilistdir(path):
+            if entry[1]:
+                result.append((entry[0], entry[1] == 0x4000))  # S_IFDIR
+            else:
+                # The type is not known on some filesystems.
+                result.append(
+                    (entry[0], _is_directory(_join_path(path, entry[0])))
+                )
+        return result
+
+else:
+
+    def _list_directory(path):
+        """
+        Return a list of (name, is_directory) tuples for the entries in the
+        directory at path.
+        """
+        with os.scandir(path) as entries:
+            return [(entry.name, entry.is_dir()) for entry in entries]
+
+
+#: The names of directories that never contain test modules, so are never
+#: walked (as well as hidden directories, whose names start with ".").
+EXCLUDED_DIRECTORIES = ("__pycache__", "node_modules")
+
+
+def find_modules(directory, pattern, ignore=()):
+    """
+    Return a sorted list of the paths of the modules whose names match the
+    glob pattern in the directory, or in any directory beneath it, along with
+    a list of the paths of the directories that were walked.
+
+    Hidden directories, those in EXCLUDED_DIRECTORIES, and any directory or
+    module matching one of the ignore globs are skipped without being walked.
+    A glob containing "/" is matched against the path of each directory and
+    module (e.g. "tests/assets"), otherwise against its name (e.g. "*_data").
+    """
+    match = _compile_glob(pattern)
+    ignored = [("/" in glob, _compile_glob(glob)) for glob in ignore]
+    modules = []
+    directories = []
+
+    def walk(path):
+        directories.append(path)
+        for name, is_directory in sorted(_list_directory(path)):
+            if is_directory:
+                if name.startswith(".") or name in EXCLUDED_DIRECTORIES:
+                    continue
+            elif not match(name):
+                continue
+            child = _join_path(path, name)
+            if ignored and any(
+                [
+                    matches(child if by_path else name)
+                    for by_path, matches in ignored
+                ]
+            ):
+                continue
+            if is_directory:
+                walk(child)
+            else:
+                modules.append(child)
+
+    walk(_normalize_path(directory))
+    return modules, directories
+
+
+def _file_stamp(path):
+    """
+    Return a JSON serializable stamp of the size and modification time of the
+    file or directory at path, or None if it does not exist.
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    # Prefer nanosecond resolution where available (i.e. not MicroPython).
+    return [stat[6], getattr(stat, "st_mtime_ns", stat[8])]
+
+
+class Manifest:
+    """
+    A record, persisted as JSON, of the test modules found in each target
+    directory and of the names and markers of the tests in each test module
+    (an index of the tests, against which they are selected). It allows
+    unchanged directories to be collected without being walked, and unchanged
+    test modules to be collected without being imported.
+    """
+
+    #: Bump this whenever the structure of the persisted data changes.
+    version = 3
+
+    def __init__(self, path):
+        """
+        A Manifest is instantiated with the path of the JSON file in which it
+        is persisted. A missing, unreadable or outdated file is ignored.
+        """
+        import json
+
+        self.path = path
+        self.changed = False
+        data = {}
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            pass
+        if data.get("version") != self.version:
+            data = {}
+        self._directories = data.get("directories", {})
+        self._modules = data.get("modules", {})
+
+    def module_paths(self, target, pattern, ignore=()):
+        """
+        Return the list of paths of test modules matching the pattern (and
+        not the ignore globs) in the target directory, or None if they are
+        not known or any directory walked to find them has changed since they
+        were recorded.
+        """
+        entry = self._directories.get(target)
+        if (
+            not entry
+            or entry["pattern"] != pattern
+            or entry.get("ignore", []) != list(ignore)
+        ):
+            return None
+        for directory, stamp in entry["stamps"].items():
+            if _file_stamp(directory) != stamp:
+                return None
+        return entry["modules"]
+
+    def record_module_paths(
+        self, target, pattern, module_paths, directories, ignore=()
+    ):
+        """
+        Record the list of paths of test modules matching the pattern (and
+        not the ignore globs) in the target directory, along with stamps of
+        the directories walked to find them (as returned by find_modules).
+        """
+        self._directories[target] = {
+            "pattern": pattern,
+            "ignore": list(ignore),
+            "stamps": dict([(d, _file_stamp(d)) for d in directories]),
+            "modules": module_paths,
+        }
+        self.changed = True
+
+    def test_index(self, module_path):
+        """
+        Return the index of the tests in the module at module_path (a list of
+        [test_name, markers] pairs, with a third item listing the [case_id,
+        markers] of each case of a parametrized test), or None if it is not
+        known or the module has changed since it was recorded.
+        """
+        entry = self._modules.get(module_path)
+        if not entry or entry["stamp"] != _file_stamp(module_path):
+            return None
+        return entry["tests"]
+
+    def record_test_index(self, module_path, test_index):
+        """
+        Record the index of the tests in the module at module_path (as
+        returned by TestModule.load).
+        """
+        tests = []
+        for name, markers, case_index in test_index:
+            entry = [name, list(markers)]
+            if case_index:
+                entry.append(
+                    [
+                        [case_id, list(case_markers)]
+                        for case_id, case_markers in case_index()
+                    ]
+                )
+            tests.append(entry)
+        self._modules[module_path] = {
+            "stamp": _file_stamp(module_path),
+            "tests": tests,
+        }
+        self.changed = True
+
+    def save(self):
+        """
+        Persist the manifest as JSON, if it has changed.
+        """
+        if not self.changed:
+            return
+        import json
+
+        with open(self.path, "w") as f:
+            json.dump(
+                {
+                    "version": self.version,
+                    "directories": self._directories,
+                    "modules": self._modules,
+                },
+                f,
+            )
+        self.changed = False
+
+
+class FileCache:
+    """
+    Persists what is remembered between test runs (such as the node ids of
+    the tests that failed) as JSON in a file on the virtual filesystem or
+    local disk.
+
+    Any object with the same load and save methods may be used instead, to
+    persist this elsewhere (see BrowserStorageCache).
+    """
+
+    def __init__(self, path=".upytest_cache.json"):
+        """
+        A FileCache is instantiated with the path of its JSON file.
+        """
+        self.path = path
+
+    def load(self):
+        """
+        Return the dictionary of cached data, which is empty if there is none.
+        """
+        import json
+
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save(self, data):
+        """
+        Persist the dictionary of cached data.
+        """
+        import json
+
+        with open(self.path, "w") as f:
+            json.dump(data, f)
+
+
+class BrowserStorageCache:
+    """
+    Persists what is remembered between test runs as JSON in the browser's
+    localStorage, so it also survives reloading the page.
+    """
+
+    def __init__(self, key="upytest"):
+        """
+        A BrowserStorageCache is instantiated with the localStorage key under
+        which to store its JSON.
+        """
+        self.key = key
+
+    def load(self):
+        """
+        Return the dictionary of cached data, which is empty if there is none.
+        """
+        import json
+        from pyscript import window
+
+        value = window.localStorage.getItem(self.key)
+        if not value:
+            return {}
+        try:
+            return json.loads(value)
+        except ValueError:
+            return {}
+
+    def save(self, data):
+        """
+        Persist the dictionary of cached data.
+        """
+        import json
+        from pyscript import window
+
+        window.localStorage.setItem(self.key, json.dumps(data))
+
+
+def normalize_node_id(node_id):
+    """
+    Return the node id without any leading "./", so the same test has the
+    same node id whether it was found via "./tests" or "tests".
+    """
+    while node_id.startswith("./"):
+        node_id = node_id[2:]
+    return node_id
+
+
+def collect_module(
+    module_path,
+    setup=None,
+    teardown=None,
+    manifest=None,
+    selection=None,
+    isolate=False,
+):
+    """
+    Return a TestModule for the Python module at module_path. If a manifest
+    has an up to date index of the tests in the module, it is not imported
+    until its tests are run. If a Selection is given, only the tests it
+    selects are instantiated.
+
+    If isolate is True, the module is imported afresh (even if it was
+    imported before) and the names of the modules its import added to
+    sys.modules are recorded, so they can be unloaded once it has run.
+    """
+    module_path = str(module_path)
+    if isolate:
+        unload_modules([module_name(module_path)])
+    if manifest:
+        test_index = manifest.test_index(module_path)
+        if test_index is not None:
+            return TestModule(
+                module_path, None, setup, teardown, test_index, selection
+            )
+    module = TestModule(module_path, None, setup, teardown)
+    before = set(sys.modules) if isolate else None
+    try:
+        test_index = module.load(import_module(module_path), selection)
+    except ModuleSkipped as ex:
+        # Not recorded in the manifest, so the module is imported (and so
+        # skipped, or not) afresh by the next test run. Forget anything it
+        # decorated before it was skipped.
+        forget_tests([module_name(module_path)])
+        module.skip(ex.args[0] if ex.args else "")
+        if selection and not selection.selects(module_path, "", ()):
+            module._tests = []
+        return module
+    finally:
+        if isolate:
+            module.imported = set(sys.modules) - before
+    if manifest:
+        manifest.record_test_index(module_path, test_index)
+    return module
+
+
+def _module_of(item):
+    """
+    Return the name of the module in which the function or class was defined,
+    or None if it can't be told.
+    """
+    namespace = getattr(item, "__globals__", None)
+    if namespace is not None:
+        return namespace.get("__name__")
+    return getattr(item, "__module__", None)
+
+
+def forget_tests(names):
+    """
+    Remove the functions and classes defined in the named modules from the
+    registries filled by the decorators, such as skip and parametrize, so
+    they don't grow each time a module is imported afresh (or its import is
+    abandoned, e.g. by skip_module).
+    """
+    names = set(names)
+    for registry in (
+        _SKIPPED_TESTS,
+        _SERIAL_TESTS,
+        _TEST_TIMEOUTS,
+        _TEST_MARKERS,
+        _BENCHMARKS,
+        _PARAMETRIZED_TESTS,
+    ):
+        for key in [
+            key
+            for key, entry in registry.items()
+            if _module_of(entry[0]) in names
+        ]:
+            del registry[key]
+
+
+def unload_modules(names):
+    """
+    Remove the named modules from sys.modules, and from the packages that
+    contain them, so they can be garbage collected and are imported afresh
+    the next time they are needed. Packages are never removed, since other
+    modules that are still loaded may be within them.
+    """
+    unloaded = []
+    for name in names:
+        module = sys.modules.get(name)
+        if module is None or hasattr(module, "__path__"):
+            continue
+        unloaded.append(name)
+        del sys.modules[name]
+        if "." in name:
+            package_name, attribute = name.rsplit(".", 1)
+            package = sys.modules.get(package_name)
+            if getattr(package, attribute, None) is module:
+                delattr(package, attribute)
+    if unloaded:
+        forget_tests(unloaded)
+
+
+def print_fixture_error(name, location, ex):
+    """
+    Print the error raised by the named setup or teardown function found in
+    the given location, so it is reported without stopping the test run.
+    """
+    print(f"\n\033[31;1mError in {name} for {location}:\033[0m")
+    print(parse_traceback_from_exception(ex).strip())
+
+
+def gather_conftest_functions(conftest_path, target, session_fixtures=None):
+    """
+    Import the conftest.py module from the given path, and return the
+    global setup and teardown functions for the target (if they exist).
+
+    If a session_fixtures list is given, a (setup_session, teardown_session,
+    conftest_path) tuple is added to it for a conftest.py containing either
+    of them, unless they were already added for an earlier target.
+    """
+    if _exists(conftest_path):
+        print(
+            f"Using \033[1m{conftest_path}\033[0m for global setup and teardown in \033[1m{target}\033[0m."
+        )
+        conftest = import_module(conftest_path)
+        setup = conftest.setup if hasattr(conftest, "setup") else None
+        teardown = conftest.teardown if hasattr(conftest, "teardown") else None
+        if session_fixtures is not None:
+            fixtures = (
+                getattr(conftest, "setup_session", None),
+                getattr(conftest, "teardown_session", None),
+                conftest_path,
+            )
+            if (fixtures[0] or fixtures[1]) and not [
+                f for f in session_fixtures if f[:2] == fixtures[:2]
+            ]:
+                session_fixtures.append(fixtures)
+        return setup, teardown
+    return None, None
+
+
+def chain_fixtures(fixtures):
+    """
+    Return a single setup or teardown function that calls each of the given
+    fixtures (ignoring any that are None) in turn, or None if there are none.
+
+    The function is async if any of the fixtures are, and is the fixture
+    itself if there is only one.
+    """
+    fixtures = [f for f in fixtures if f]
+    if not fixtures:
+        return None
+    if len(fixtures) == 1:
+        return fixtures[0]
+    if any(is_awaitable(f) for f in fixtures):
+
+        async def chained():
+            for fixture in fixtures:
+                await call_fixture(fixture)
+
+    else:
+
+        def chained():
+            for fixture in fixtures:
+                fixture()
+
+    return chained
+
+
+class Conftests:
+    """
+    Resolves the global setup and teardown functions for the test modules in
+    each directory, from the conftest.py files in that directory and in each
+    directory above it, up to the current working directory (the root of the
+    test suite).
+
+    Nested conftest.py files chain: the setup functions are called from the
+    outermost conftest.py inwards, and the teardown functions in reverse. Each
+    directory is only checked (and its conftest.py only imported) once per
+    test run, however many targets or test modules are within it.
+    """
+
+    def __init__(self, session_fixtures=None):
+        """
+        If a session_fixtures list is given, it is filled with
+        (setup_session, teardown_session, conftest_path) tuples from the
+        conftest.py files found, outermost first.
+        """
+        self.session_fixtures = session_fixtures
+        # {directory: (setups, teardowns, setup, teardown)} where setups and
+        # teardowns are the lists of the functions to chain, in the order in
+        # which they are called.
+        self._directories = {}
+
+    def _resolve(self, directory):
+        """
+        Return the (setups, teardowns, setup, teardown) tuple for the
+        directory, resolving (and remembering) it if needed.
+        """
+        resolved = self._directories.get(directory)
+        if resolved is None:
+            setups = []
+            teardowns = []
+            if directory not in (".", "/"):
+                parent = self._resolve(_parent_path(directory))
+                setups = parent[0]
+                teardowns = parent[1]
+            setup, teardown = gather_conftest_functions(
+                _join_path(directory, "conftest.py"),
+                directory,
+                self.session_fixtures,
+            )
+            if setup:
+                setups = setups + [setup]
+            if teardown:
+                teardowns = [teardown] + teardowns
+            resolved = (
+                setups,
+                teardowns,
+                chain_fixtures(setups),
+                chain_fixtures(teardowns),
+            )
+            self._directories[directory] = resolved
+        return resolved
+
+    def fixtures(self, module_path):
+        """
+        Return the global (setup, teardown) functions for the test module at
+        module_path (either may be None).
+        """
+        resolved = self._resolve(_parent_path(module_path))
+        return resolved[2], resolved[3]
+
+
+def discover(
+    targets,
+    pattern,
+    setup=None,
+    teardown=None,
+    manifest=None,
+    session_fixtures=None,
+    selection=None,
+    hooks=None,
+    ignore=(),
+    isolate=False,
+):
+    """
+    Return a list of TestModule instances representing Python modules
+    recursively found via the targets and, if a target is a directory, whose
+    module name matches the pattern for identifying test modules.
+
+    The targets may be simply a string describing the directory in
+    which to start looking for test modules (e.g. "./tests"), or strings
+    representing the names of specific test modules / tests to run (of the
+    form: "module_path" or "module_path::test_function" or
+    "module_path::test_function_1,test_function_2"; e.g. "tests/test_module.py"
+    or "tests/test_module.py::test_stuff" or
+    "tests/test_module.py::test_stuff,test_more_stuff").
+
+    If there is a conftest.py file in the directory containing a test module,
+    or in any directory above it, it will be imported for any global setup
+    and teardown functions to use for the module. Those of nested conftest.py
+    files are chained (see Conftests). These setup and teardown functions can
+    be overridden in the individual test modules.
+
+    If a Manifest is given, it is used to avoid walking unchanged directories
+    and importing unchanged test modules, and is updated with anything that
+    had to be walked or imported.
+
+    If a session_fixtures list is given, it is filled with (setup_session,
+    teardown_session, conftest_path) tuples from the conftest.py files found.
+
+    If a Selection is given, only the tests it selects are instantiated, and
+    modules without any selected tests are left out.
+
+    If Hooks are given, their on_module_collected hook is called with each
+    TestModule that is collected.
+
+    Directories and modules matching any of the ignore globs are skipped
+    when walking a target directory (see find_modules).
+
+    If isolate is True, the test modules are imported afresh, and the
+    modules each of them imports are recorded (see collect_module).
+    """
+    conftests = Conftests(session_fixtures)
+    result = []
+    for target in targets:
+        if "::" in target:
+            module_path, test_names = target.split("::")
+            setup, teardown = conftests.fixtures(module_path)
+            names = test_names.split(",")
+            if selection:
+                target_selection = selection.with_names(names)
+            else:
+                target_selection = Selection(names=names)
+            module = collect_module(
+                module_path,
+                setup,
+                teardown,
+                manifest,
+                target_selection,
+                isolate,
+            )
+            if module.tests or not selection:
+                result.append(module)
+        elif _is_directory(target):
+            module_paths = None
+            if manifest:
+                module_paths = manifest.module_paths(target, pattern, ignore)
+            if module_paths is None:
+                module_paths, directories = find_modules(
+                    target, pattern, ignore
+                )
+                if manifest:
+                    manifest.record_module_paths(
+                        target, pattern, module_paths, directories, ignore
+                    )
+            for module_path in module_paths:
+                setup, teardown = conftests.fixtures(module_path)
+                module = collect_module(
+                    module_path, setup, teardown, manifest, selection, isolate
+                )
+                if module.tests or not selection:
+                    result.append(module)
+        else:
+            setup, teardown = conftests.fixtures(target)
+            module = collect_module(
+                target, setup, teardown, manifest, selection, isolate
+            )
+            if module.tests or not selection:
+                result.append(module)
+    if hooks and hooks.on_module_collected:
+        for module in result:
+            hooks.on_module_collected(module)
+    return result
+
+
+def shard(test_modules, shard_index, shard_count):
+    """
+    Return a list of the TestModule instances limited to the tests in the
+    shard_index-th (counting from zero) of shard_count disjoint slices of all
+    the tests they contain. Modules left without tests are dropped.
+
+    The slices are contiguous runs of the sorted node ids of the tests, so
+    they are the same whatever the interpreter or the order of discovery, and
+    most modules only need to run in a single shard.
+    """
+    if not 0 <= shard_index < shard_count:
+        raise ValueError(
+            f"Invalid shard {shard_index} of {shard_count} shard[s]."
+        )
+    node_ids = sorted(
+        [node_id for module in test_modules for node_id in module.node_ids()]
+    )
+    start = len(node_ids) * shard_index // shard_count
+    end = len(node_ids) * (shard_index + 1) // shard_count
+    selected = set(node_ids[start:end])
+    result = []
+    for module in test_modules:
+        module.limit_tests_to_node_ids(selected)
+        if module.tests:
+            result.append(module)
+    return result
+
+
+class raises:
+    """
+    A context manager to ensure expected exceptions are raised.
+    """
+
+    def __init__(self, *expected_exceptions):
+        """
+        Pass in expected exception classes that should be raised within the
         scope of the context manager.
         """
         if not expected_exceptions:
@@ -456,7 +2961,61 @@ def skip(reason="", skip_when=True):
 
         def decorator(func):
             global _SKIPPED_TESTS
-            _SKIPPED_TESTS[id(func)] = reason
+            _SKIPPED_TESTS[id(func)] = (func, reason)
+            return func
+
+    else:
+
+        def decorator(func):
+            return func
+
+    return decorator
+
+
+class ModuleSkipped(Exception):
+    """
+    Raised by skip_module to stop the import (and so the collection) of the
+    rest of a test module.
+    """
+
+
+def skip_module(reason="", skip_when=True):
+    """
+    Skip all the tests in the test module from which this is called, at its
+    top level, with an optional reason. The rest of the module is neither
+    imported nor collected, so none of its tests (or its setup, teardown,
+    setup_module or teardown_module functions) are run, and it is reported as
+    a single skipped test.
+
+    As with skip, the module is only skipped if the optional skip_when
+    argument is True (the default value is True). E.g.:
+
+    upytest.skip_module("Needs the DOM", skip_when=RUNNING_IN_WORKER)
+    """
+    if skip_when:
+        raise ModuleSkipped(reason)
+
+
+def serial(serial_when=True):
+    """
+    A decorator to indicate the decorated async test function must never be
+    run concurrently with other tests, even when the test suite is run with
+    a concurrency greater than one.
+
+    The test will only be run serially if the optional serial_when argument is
+    True (the default value is True). This is useful for tests that depend on
+    shared state that other tests may change. E.g.:
+
+    @serial()
+    async def test_something():
+        assert 1 == 1
+    """
+
+    if serial_when:
+
+        def decorator(func):
+            global _SERIAL_TESTS
+            _SERIAL_TESTS[id(func)] = (func, True)
             return func
 
     else:
@@ -467,6 +3026,580 @@ def skip(reason="", skip_when=True):
     return decorator
 
 
+def timeout(seconds):
+    """
+    A decorator to give the decorated test function a time limit, in seconds.
+    This takes precedence over any timeout given when the test suite is run.
+
+    An async test that takes longer than its time limit is cancelled and
+    reported as timed out, rather than stalling the rest of the test suite.
+    Its teardown still runs. E.g.:
+
+    @timeout(0.5)
+    async def test_something():
+        await something_that_may_never_resolve()
+    """
+
+    def decorator(func):
+        global _TEST_TIMEOUTS
+        _TEST_TIMEOUTS[id(func)] = (func, seconds)
+        return func
+
+    return decorator
+
+
+def mark(*markers):
+    """
+    A decorator to give the decorated test function or test class one or more
+    markers (names), so the tests can be selected or deselected by a marker
+    expression when the test suite is run. The markers of a test class apply
+    to all its test methods. E.g.:
+
+    @mark("slow", "network")
+    async def test_something():
+        assert 1 == 1
+    """
+    if not markers:
+        raise ValueError("Missing markers.")
+    for marker in markers:
+        if (
+            not isinstance(marker, str)
+            or not marker
+            or marker in ("and", "or", "not")
+            or any(c in marker for c in "() ")
+        ):
+            raise ValueError(f"Invalid marker: {marker!r}")
+
+    def decorator(func):
+        global _TEST_MARKERS
+        _TEST_MARKERS[id(func)] = (
+            func,
+            _registered(_TEST_MARKERS, func, ()) + markers,
+        )
+        return func
+
+    return decorator
+
+
+def benchmark(rounds=5, warmup_rounds=1, min_time=0.01, iterations=None):
+    """
+    A decorator to indicate the decorated test function is a benchmark.
+
+    Instead of being called once, the test is called repeatedly: the number
+    of iterations per round is calibrated so each round takes at least
+    min_time seconds, then the test is run for warmup_rounds untimed rounds
+    followed by rounds timed rounds. (Give a number of iterations to skip
+    calibration.) The test's setup and teardown are only run once, around
+    all the rounds, and benchmarks never overlap with other tests.
+
+    The statistics of the time taken per call (min, max, mean, median,
+    stddev, ops per second, rounds and iterations) are recorded, as a
+    dictionary, in the "benchmark" entry of the test's result, and listed in
+    a table at the end of the test run. E.g.:
+
+    @benchmark(rounds=10)
+    def test_sort():
+        assert sorted([3, 1, 2]) == [1, 2, 3]
+    """
+    options = Benchmark(rounds, warmup_rounds, min_time, iterations)
+
+    def decorator(func):
+        global _BENCHMARKS
+        _BENCHMARKS[id(func)] = (func, options)
+        return func
+
+    return decorator
+
+
+def parametrize(argnames, cases, ids=None):
+    """
+    A decorator to run the decorated test function once for each of the given
+    cases, passing the values of each case as the named arguments. Each case
+    is reported as a separate test, whose name ends with the id of the case
+    (e.g. "test_add[3-4-7]"). E.g.:
+
+    @parametrize("x,y,total", [(3, 4, 7), (1, 1, 2)])
+    def test_add(x, y, total):
+        assert x + y == total
+
+    The argnames are a comma separated string or a list of names. For a
+    single argument, each case is its value; otherwise, each case is a tuple
+    of values. A case may also be given with param, for its own id, markers
+    or reason to be skipped.
+
+    The cases may be a list or tuple, or a function (such as a generator
+    function) that returns them, and which is called whenever they are
+    needed, so they are produced lazily rather than held in memory. (Any
+    other iterable, such as a generator, is only consumed once, so it is
+    turned into a list when it is first needed.)
+
+    By default, the id of a case is made from its values (or, for values
+    that are not simple numbers, strings, booleans or None, from the
+    argument name and the index of the case). To use other ids, give a list
+    of ids, or a function that returns the id given the values of a case.
+    """
+    if isinstance(argnames, str):
+        argnames = [name.strip() for name in argnames.split(",")]
+    argnames = tuple([name for name in argnames if name])
+    if not argnames:
+        raise ValueError("Missing argument names.")
+
+    def decorator(func):
+        global _PARAMETRIZED_TESTS
+        _PARAMETRIZED_TESTS[id(func)] = (func, (argnames, cases, ids))
+        return func
+
+    return decorator
+
+
+def param(*values, id=None, markers=(), skip=None):
+    """
+    Return one case of a parametrized test, with the given values, and an
+    optional id to use instead of one made from the values, tuple of markers
+    (in addition to those of the test) and reason to skip the case. E.g.:
+
+    @parametrize("x,y", [(1, 1), param(2, 2, markers=("slow",)),
+                         param(3, 4, skip="Not implemented yet.")])
+    def test_equal(x, y):
+        assert x == y
+    """
+    return Param(values, id, markers, skip)
+
+
+class TestRun:
+    """
+    An asynchronous iterator over the outcomes of running a test suite.
+
+    Each outcome is the dictionary representation of a TestCase, produced as
+    soon as the test has finished. Test modules are released as soon as they
+    have run, so only the outcomes that have not yet been consumed are held
+    in memory.
+    """
+
+    def __init__(
+        self,
+        targets,
+        pattern="test_*.py",
+        randomize=False,
+        concurrency=1,
+        shard_index=0,
+        shard_count=1,
+        manifest=None,
+        timeout=None,
+        traceback_format=None,
+        maxfail=None,
+        cache=None,
+        last_failed=False,
+        failed_first=False,
+        keyword=None,
+        marker=None,
+        plugins=None,
+        memory=None,
+        collect_ignore=(),
+        isolate=False,
+    ):
+        """
+        A TestRun is instantiated with a list of targets and the options
+        described in the docstring for run. The tests are discovered (and
+        selected) immediately, but are only run once iteration starts.
+
+        The cache, if given, is an object with load and save methods (such as
+        a FileCache) in which the node ids of failing tests are remembered.
+        """
+        self.randomize = randomize
+        self.concurrency = concurrency
+        self.shard_index = shard_index
+        self.shard_count = shard_count
+        self.timeout = timeout
+        self.traceback_format = traceback_format
+        self.maxfail = maxfail
+        self.isolate = isolate
+        # A MemoryMonitor (if given) measures the heap before other plugins.
+        self.memory = memory
+        plugins = ([memory] if memory else []) + list(plugins or [])
+        self.hooks = Hooks(plugins) if plugins else _NO_HOOKS
+        self.failure_count = 0
+        self.stopped = False
+        if manifest:
+            manifest = Manifest(manifest)
+        selection = None
+        if keyword or marker:
+            selection = Selection(keyword, marker)
+        self.session_fixtures = []
+        test_modules = discover(
+            targets,
+            pattern,
+            manifest=manifest,
+            session_fixtures=self.session_fixtures,
+            selection=selection,
+            hooks=self.hooks,
+            ignore=collect_ignore,
+            isolate=isolate,
+        )
+        if manifest:
+            manifest.save()
+        self.cache = cache
+        self.cache_data = cache.load() if cache else {}
+        self.last_failed = set(self.cache_data.get("last_failed", []))
+        # True if only the tests that failed last time are run (if none of
+        # them were collected, all the tests are run instead).
+        self.only_last_failed = False
+        if last_failed and self.last_failed:
+            selected = set()
+            for module in test_modules:
+                for node_id in module.node_ids():
+                    if normalize_node_id(node_id) in self.last_failed:
+                        selected.add(node_id)
+            self.only_last_failed = bool(selected)
+        if self.only_last_failed:
+            result = []
+            for module in test_modules:
+                module.limit_tests_to_node_ids(selected)
+                if module.tests:
+                    result.append(module)
+            test_modules = result
+        if shard_count > 1:
+            test_modules = shard(test_modules, shard_index, shard_count)
+        if randomize:
+            shuffle(test_modules)
+        if failed_first and self.last_failed:
+            first = []
+            rest = []
+            for module in test_modules:
+                node_ids = set(
+                    [
+                        node_id
+                        for node_id in module.node_ids()
+                        if normalize_node_id(node_id) in self.last_failed
+                    ]
+                )
+                if module.prioritize(node_ids):
+                    first.append(module)
+                else:
+                    rest.append(module)
+            test_modules = first + rest
+        self.test_modules = test_modules
+        self.module_count = len(test_modules)
+        self.test_count = sum([module.test_count for module in test_modules])
+        self._task = None
+        self._outcomes = []
+        self._finished = False
+        self._closed = False
+        self._error = None
+        self._ready = asyncio.Event()
+        self._consumed = asyncio.Event()
+
+    def __aiter__(self):
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
+
+    async def __anext__(self):
+        """
+        Return the outcome of the next test to finish, running the test suite
+        in a separate task to the consumer of the outcomes.
+        """
+        if self._task is None:
+            self._task = asyncio.create_task(self._produce())
+        while not self._outcomes:
+            if self._finished:
+                if self._error:
+                    raise self._error
+                raise StopAsyncIteration
+            self._ready.clear()
+            await self._ready.wait()
+        outcome = self._outcomes.pop(0)
+        self._consumed.set()
+        return outcome
+
+    async def aclose(self):
+        """
+        Stop running the test suite, if the consumer of the outcomes is no
+        longer interested in them, and wait until it has stopped. The tests
+        that are already running are allowed to finish, then the remaining
+        tests are abandoned and the teardown_session functions are called,
+        the cache is saved and the plugins are told the session has finished
+        (e.g. so reporters close their files).
+
+        Breaking out of an "async for" loop doesn't close the test run, so
+        either call this, or use the test run as an async context manager:
+
+        async with upytest.iter_run("./tests") as test_run:
+            async for outcome in test_run:
+                ...
+        """
+        self._closed = True
+        self._outcomes = []
+        if self._task and not self._finished:
+            self._consumed.set()
+            await self._task
+        self._finished = True
+
+    async def _produce(self):
+        """
+        Run each module in turn, releasing it once it has finished. If the
+        test run has stopped early, the tests that were not run are reported
+        as such (without importing any modules that are yet to be loaded).
+
+        Any setup_session functions from conftest.py files are evaluated once
+        before the first test, and the matching teardown_session functions
+        once after the last test (even if the tests fail).
+        """
+        teardowns = []
+        try:
+            if self.hooks.on_session_start:
+                self.hooks.on_session_start(self)
+            if self.test_count:
+                for setup, teardown, path in self.session_fixtures:
+                    if setup:
+                        await call_fixture(setup)
+                    teardowns.append((teardown, path))
+            while self.test_modules and not self._closed:
+                module = self.test_modules.pop(0)
+                if self.isolate:
+                    before = set(sys.modules)
+                if not self.stopped:
+                    await module.run(
+                        self.randomize,
+                        self.concurrency,
+                        self._put,
+                        self.timeout,
+                        self.traceback_format,
+                        self.hooks,
+                    )
+                if self.stopped:
+                    for test_case in module.unfinished_tests():
+                        test_case.status = NOT_RUN
+                        await self._put(test_case)
+                if self.isolate:
+                    # Unload the modules imported by (or while running) the
+                    # test module, then release it, so its memory is freed.
+                    imported = module.imported
+                    module = None
+                    unload_modules((set(sys.modules) - before).union(imported))
+                    gc.collect()
+        except Exception as ex:
+            self._error = ex
+        finally:
+            for teardown, path in reversed(teardowns):
+                if teardown:
+                    try:
+                        await call_fixture(teardown)
+                    except Exception as ex:
+                        print_fixture_error("teardown_session", path, ex)
+            output.flush()
+            if self.cache:
+                self.cache_data["last_failed"] = sorted(self.last_failed)
+                self.cache.save(self.cache_data)
+            if self.hooks.on_session_finish:
+                try:
+                    self.hooks.on_session_finish(self)
+                except Exception as ex:
+                    self._error = self._error or ex
+            self._finished = True
+            self._ready.set()
+
+    async def _put(self, test_case):
+        """
+        Hand the outcome of a finished test to the consumer, waiting for it to
+        catch up if there is already an outcome for each concurrent test.
+
+        Return True if the test run should stop, because the maximum number
+        of failures has been reached.
+        """
+        if test_case.status in (FAIL, TIMEOUT):
+            self.failure_count += 1
+            if self.maxfail and self.failure_count >= self.maxfail:
+                self.stopped = True
+            self.last_failed.add(normalize_node_id(test_case.node_id))
+        elif test_case.status in (PASS, SKIPPED):
+            self.last_failed.discard(normalize_node_id(test_case.node_id))
+        if self._closed:
+            # Nobody will consume the outcome, so stop as soon as possible.
+            return True
+        self._outcomes.append(test_case.as_dict)
+        self._ready.set()
+        while len(self._outcomes) > self.concurrency and not self._closed:
+            self._consumed.clear()
+            await self._consumed.wait()
+        return self.stopped
+
+
+def iter_run(*args, **kwargs):
+    """
+    Return a TestRun: an asynchronous iterator over the outcomes of the tests
+    specified by the args, yielding the dictionary representation of each
+    test as soon as it has finished. E.g.:
+
+    async for outcome in upytest.iter_run("./tests"):
+        print(outcome["node_id"], outcome["status"], outcome["duration"])
+
+    To stop before every test has finished, close the test run (see
+    TestRun.aclose), most simply by using it as an async context manager.
+
+    The args and named arguments are the same as those for run.
+    """
+    targets = []
+    for arg in args:
+        if isinstance(arg, str):
+            targets.append(arg)
+        else:
+            raise ValueError(f"Unexpected argument: {arg}")
+    cache = kwargs.get("cache")
+    if cache is True or (
+        cache is None
+        and (kwargs.get("last_failed") or kwargs.get("failed_first"))
+    ):
+        cache = FileCache()
+    elif isinstance(cache, str):
+        cache = FileCache(cache)
+    plugins = list(kwargs.get("plugins") or [])
+    if kwargs.get("junitxml"):
+        plugins.append(JUnitXMLReporter(kwargs["junitxml"]))
+    if kwargs.get("jsonl"):
+        plugins.append(JSONLinesReporter(kwargs["jsonl"]))
+    return TestRun(
+        targets,
+        pattern=kwargs.get("pattern", "test_*.py"),
+        randomize=kwargs.get("random", False),
+        concurrency=kwargs.get("concurrency", 1),
+        shard_index=kwargs.get("shard_index", 0),
+        shard_count=kwargs.get("shard_count", 1),
+        manifest=kwargs.get("manifest"),
+        timeout=kwargs.get("timeout"),
+        traceback_format=TracebackFormat(
+            kwargs.get("tb", "long"),
+            kwargs.get("tb_depth"),
+            kwargs.get("tb_chars"),
+        ),
+        maxfail=1 if kwargs.get("exitfirst") else kwargs.get("maxfail"),
+        cache=cache,
+        last_failed=kwargs.get("last_failed", False),
+        failed_first=kwargs.get("failed_first", False),
+        keyword=kwargs.get("keyword"),
+        marker=kwargs.get("marker"),
+        plugins=plugins,
+        memory=MemoryMonitor(kwargs.get("gc_collect", False))
+        if kwargs.get("memory")
+        else None,
+        collect_ignore=kwargs.get("collect_ignore", ()),
+        isolate=kwargs.get("isolate", False),
+    )
+
+
+def print_durations(outcomes, count):
+    """
+    Print the slowest count phases (setup, call or teardown) of the tests
+    whose outcomes are given, or all of them if count is 0.
+    """
+    phases = []
+    for outcome in outcomes:
+        for phase in ("setup", "call", "teardown"):
+            duration = outcome[f"{phase}_duration"]
+            if duration:
+                phases.append((duration, phase, outcome["node_id"]))
+    phases = sorted(phases, key=lambda p: p[0], reverse=True)
+    if count:
+        phases = phases[:count]
+    heading = (
+        "slowest durations" if count == 0 else f"slowest {count} durations"
+    )
+    print(
+        f"============================ \033[1m{heading}\033[0m ============================"
+    )
+    for duration, phase, node_id in phases:
+        print(f"{duration:.4f}s {phase:<8} {node_id}")
+
+
+def format_seconds(seconds, unit):
+    """
+    Return the number of seconds formatted in the given unit ("s", "ms",
+    "us" or "ns").
+    """
+    scale = {"s": 1, "ms": 1e3, "us": 1e6, "ns": 1e9}[unit]
+    return f"{seconds * scale:.4f}"
+
+
+def print_benchmarks(outcomes):
+    """
+    Print a table of the statistics of the benchmarks whose outcomes are
+    given, fastest first. All the times are shown in the same unit, chosen
+    to suit the fastest benchmark.
+    """
+    benchmarks = sorted(
+        [o for o in outcomes if o.get("benchmark")],
+        key=lambda o: o["benchmark"]["min"],
+    )
+    if not benchmarks:
+        return
+    fastest = benchmarks[0]["benchmark"]["min"]
+    unit = "ns"
+    for candidate, threshold in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if fastest >= threshold:
+            unit = candidate
+            break
+    print(
+        f"=============================== \033[1mbenchmarks\033[0m ==============================="
+    )
+    columns = ("Min", "Max", "Mean", "StdDev", "Median")
+    heading = f"Name (time in {unit})"
+    width = max([len(o["node_id"]) for o in benchmarks] + [len(heading)])
+    print(
+        heading
+        + " " * (width - len(heading))
+        + "".join([f"{c:>12}" for c in columns])
+        + f"{'OPS':>14}{'Rounds':>8}{'Iterations':>12}"
+    )
+    for outcome in benchmarks:
+        stats = outcome["benchmark"]
+        print(
+            outcome["node_id"]
+            + " " * (width - len(outcome["node_id"]))
+            + "".join(
+                [
+                    f"{format_seconds(stats[c.lower()], unit):>12}"
+                    for c in columns
+                ]
+            )
+            + f"{stats['ops']:>14.4f}{stats['rounds']:>8}"
+            + f"{stats['iterations']:>12}"
+        )
+
+
+def format_bytes(size):
+    """
+    Return the number of bytes formatted in KiB.
+    """
+    return f"{size / 1024:.1f} KiB"
+
+
+def print_memory(memory):
+    """
+    Print the biggest growths of heap usage by tests, and the peak heap
+    usage of each module, from the dictionary representation of a
+    MemoryMonitor.
+    """
+    collected = ", garbage collected" if memory["collect"] else ""
+    print(
+        f"================================= \033[1mmemory\033[0m =================================="
+    )
+    print(f"Measured with {memory['backend']}{collected}.")
+    if memory["growths"]:
+        print("Biggest heap growths:")
+        for growth in memory["growths"]:
+            print(f"{format_bytes(growth['growth']):>14} {growth['node_id']}")
+    print("Peak heap usage by module:")
+    for module in memory["modules"]:
+        print(
+            f"{format_bytes(module['peak']):>14} {module['module']}"
+            f" (growth: {format_bytes(module['growth'])})"
+        )
+
+
 async def run(*args, **kwargs):
     """
     Run the test suite given args that specify the tests to run.
@@ -479,49 +3612,151 @@ async def run(*args, **kwargs):
 
     If a named `pattern` argument is provided, it will be used to match test
     modules in the specification for target directories. The default pattern is
-    "test_*.py".
+    "test_*.py". If a named `collect_ignore` argument is provided, it is a list
+    of globs for directories and modules to skip when looking for test modules
+    (see find_modules). Hidden directories, __pycache__ and node_modules are
+    always skipped.
+
+    If there is a conftest.py file in the directory containing a test module,
+    or in any directory above it, it will be imported for any global setup
+    and teardown functions to use for the module. The setup functions of
+    nested conftest.py files are called from the outermost inwards, and their
+    teardown functions in reverse. These setup and teardown functions can be
+    overridden in the individual test modules.
+
+    If a named `concurrency` argument greater than one is provided, async
+    tests within each module will overlap, with at most `concurrency` of them
+    running at once. Tests decorated with `serial` are never overlapped.
+
+    If named `shard_index` and `shard_count` arguments are provided, only the
+    shard_index-th (counting from zero) of shard_count deterministic and
+    disjoint slices of the discovered tests will be run. Use merge_results to
+    combine the results of running every shard.
+
+    If a named `manifest` argument is provided, it is the path of a JSON file
+    recording the test modules and tests found during discovery. Later runs
+    use it to skip walking unchanged directories and to only import the test
+    modules whose tests are actually run.
 
-    If there is a conftest.py file in any of the specified directories
-    containing a test module, it will be imported for any global setup and
-    teardown functions to use for modules found within that directory. These
-    setup and teardown functions can be overridden in the individual test
-    modules.
+    If a named `timeout` argument is provided, it is the time limit, in
+    seconds, for each test without its own time limit (see the timeout
+    decorator). Tests that take longer are reported as timed out.
+
+    The tracebacks of failing tests are formatted as described by the named
+    `tb` argument: "long" (the default) for the full traceback, or "line"
+    for just the failing line of the test and the exception. The named
+    `tb_depth` and `tb_chars` arguments limit the number of (most recent)
+    frames shown in each traceback, and the number of characters of each
+    formatted traceback.
+
+    If a named `maxfail` argument is provided, the test run stops once that
+    many tests have failed (or timed out), and the remaining tests are
+    reported as not run. A named `exitfirst` argument of True is shorthand
+    for maxfail=1.
+
+    If a named `cache` argument is provided, it is either the path of a JSON
+    file, an object with load and save methods (such as a FileCache or a
+    BrowserStorageCache) or True for the default FileCache, in which the node
+    ids of failing tests are remembered between runs. (Without a cache,
+    nothing is remembered, so the run in which tests fail must be given one
+    too.) A named `last_failed` argument of True runs only the tests that
+    failed last time (or all tests, if none failed), and a named
+    `failed_first` argument of True runs them before all the other tests.
+    Both default to using the default FileCache if no cache is given.
+
+    If a named `keyword` argument is provided, it is an expression of words
+    combined with "and", "or", "not" and parentheses, and only the tests for
+    which it is true are run. Each word is true if it is part of the name of
+    the test module, test class or test function, or of one of the test's
+    markers (e.g. keyword="add and not slow"). If a named `marker` argument is
+    provided, it is a similar expression in which each word is true only if
+    the test has exactly that marker (see the mark decorator). Deselected
+    tests are never instantiated, and (with a manifest) test modules without
+    any selected tests are never imported.
+
+    If a named `durations` argument is provided, the slowest `durations`
+    setup, call and teardown phases of the tests are listed at the end of the
+    run (or all of them, if `durations` is 0).
+
+    The statistics of any passing benchmarks (see the benchmark decorator)
+    are listed in a table at the end of the run.
+
+    If a named `plugins` argument is provided, it is a list of objects whose
+    methods are called at certain points during the test run (see Hooks for
+    the names of these methods and when they are called).
+
+    If a named `junitxml` or `jsonl` argument is provided, it is the path of
+    a file (or an object with a write method, such as an open file) to which
+    the outcome of each test is written as soon as it has finished, as JUnit
+    XML or as a line of JSON respectively (see JUnitXMLReporter and
+    JSONLinesReporter). The reports are never held in memory, however many
+    tests there are.
+
+    If a named `memory` argument of True is provided, heap usage is recorded
+    before and after each test and test module (see MemoryMonitor). The
+    tests whose heap usage grew the most, and the peak heap usage of each
+    module, are listed at the end of the run and included in the result. A
+    named `gc_collect` argument of True collects garbage before each
+    measurement, so only memory that is still referenced counts as growth.
+
+    If a named `isolate` argument of True is provided, each test module is
+    imported afresh (so repeated runs see any changes to its code) and, once
+    its tests have finished, it and the modules it imported are removed from
+    sys.modules and garbage is collected. This keeps memory use flat across
+    long test runs, or many runs in the same page.
+
+    The outcomes of the tests are gathered from iter_run, and summarised once
+    all the tests have finished.
     """
     print("Python interpreter: \033[1m", sys.platform, sys.version, "\033[0m")
     print("Running in worker: \033[1m", RUNNING_IN_WORKER, "\033[0m")
-    targets = []
-    pattern = kwargs.get("pattern", "test_*.py")
-    randomize = kwargs.get("random", False)
-    print("Randomize test order: \033[1m", randomize, "\033[0m")
-    for arg in args:
-        if isinstance(arg, str):
-            targets.append(arg)
+    print(
+        "Randomize test order: \033[1m", kwargs.get("random", False), "\033[0m"
+    )
+    test_run = iter_run(*args, **kwargs)
+    if test_run.concurrency > 1:
+        print("Concurrency: \033[1m", test_run.concurrency, "\033[0m")
+    if test_run.shard_count > 1:
+        print(
+            f"Running shard \033[1m{test_run.shard_index + 1}\033[0m of \033[1m{test_run.shard_count}\033[0m."
+        )
+    if kwargs.get("last_failed"):
+        if test_run.only_last_failed:
+            print("Running only the tests that failed last time.")
         else:
-            raise ValueError(f"Unexpected argument: {arg}")
-    test_modules = discover(targets, pattern)
-    if randomize:
-        shuffle(test_modules)
-    module_count = len(test_modules)
-    test_count = sum([len(module.tests) for module in test_modules])
+            print("No tests failed last time, so running all the tests.")
+    elif kwargs.get("failed_first") and test_run.last_failed:
+        print("Running the tests that failed last time first.")
+    test_count = test_run.test_count
     print(
-        f"Found {module_count} test module[s]. Running {test_count} test[s]."
+        f"Found {test_run.module_count} test module[s]. Running {test_count} test[s]."
     )
 
     failed_tests = []
     skipped_tests = []
     passed_tests = []
+    timed_out_tests = []
+    not_run_tests = []
+    # The whole run may take minutes, longer than MicroPython's microsecond
+    # ticks can measure (they wrap around), so it is timed by the clock.
     start = time.time()
-    for module in test_modules:
-        await module.run(randomize)
-        for test in module.tests:
-            if test.status == FAIL:
-                failed_tests.append(test)
-            elif test.status == SKIPPED:
-                skipped_tests.append(test)
-            elif test.status == PASS:
-                passed_tests.append(test)
-    end = time.time()
+    async for outcome in test_run:
+        if outcome["status"] == FAIL:
+            failed_tests.append(outcome)
+        elif outcome["status"] == SKIPPED:
+            skipped_tests.append(outcome)
+        elif outcome["status"] == PASS:
+            passed_tests.append(outcome)
+        elif outcome["status"] == TIMEOUT:
+            timed_out_tests.append(outcome)
+        elif outcome["status"] == NOT_RUN:
+            not_run_tests.append(outcome)
+    duration = time.time() - start
     print("\n")
+    if test_run.stopped:
+        print(
+            f"\033[31;1mStopped after {test_run.failure_count} failure[s]. {len(not_run_tests)} test[s] not run.\033[0m"
+        )
     if failed_tests:
         print(
             "================================= \033[31;1mFAILURES\033[0m ================================="
@@ -530,14 +3765,27 @@ async def run(*args, **kwargs):
             print(
                 "Failed: ",
                 "\033[1m",
-                failed.module_name,
-                "::",
-                failed.test_name,
+                failed["node_id"],
+                "\033[0m",
+                sep="",
+            )
+            print(failed["traceback"].strip())
+            if failed is not failed_tests[-1]:
+                print("")
+    if timed_out_tests:
+        print(
+            "================================= \033[31;1mTIMEOUTS\033[0m ================================="
+        )
+        for timed_out in timed_out_tests:
+            print(
+                "Timed out: ",
+                "\033[1m",
+                timed_out["node_id"],
                 "\033[0m",
                 sep="",
             )
-            print(failed.traceback.strip())
-            if failed != failed_tests[-1]:
+            print(timed_out["reason"])
+            if timed_out is not timed_out_tests[-1]:
                 print("")
     if skipped_tests:
         print(
@@ -547,32 +3795,322 @@ async def run(*args, **kwargs):
             print(
                 "Skipped: ",
                 "\033[1m",
-                test_case.module_name,
-                "::",
-                test_case.test_name,
+                test_case["node_id"],
                 "\033[0m",
                 sep="",
             )
-            print(f"Reason: {test_case.reason}")
-            if test_case != skipped_tests[-1]:
+            print(f"Reason: {test_case['reason']}")
+            if test_case is not skipped_tests[-1]:
                 print("")
+    durations = kwargs.get("durations")
+    if durations is not None:
+        print_durations(
+            passed_tests + failed_tests + timed_out_tests, durations
+        )
+    print_benchmarks(passed_tests)
+    if test_run.memory:
+        print_memory(test_run.memory.as_dict)
     error_count = len(failed_tests)
     skip_count = len(skipped_tests)
-    pass_count = test_count - error_count - skip_count
-    duration = end - start
+    timeout_count = len(timed_out_tests)
+    not_run_count = len(not_run_tests)
+    # Counted, rather than worked out from the number of tests collected,
+    # since the cases of a parametrized test may change once it's imported.
+    pass_count = len(passed_tests)
     print(
         "========================= short test summary info =========================="
     )
+    extra_summary = ""
+    if timeout_count:
+        extra_summary = (
+            f"\033[1m{timeout_count}\033[0m \033[31;1mtimed out\033[0m, "
+        )
+    if not_run_count:
+        extra_summary += f"\033[1m{not_run_count}\033[0m not run, "
     print(
-        f"\033[1m{error_count}\033[0m \033[31;1mfailed\033[0m, \033[1m{skip_count}\033[0m \033[33;1mskipped\033[0m, \033[1m{pass_count}\033[0m \033[32;1mpassed\033[0m in \033[1m{duration:.2f} seconds\033[0m"
+        f"\033[1m{error_count}\033[0m \033[31;1mfailed\033[0m, {extra_summary}\033[1m{skip_count}\033[0m \033[33;1mskipped\033[0m, \033[1m{pass_count}\033[0m \033[32;1mpassed\033[0m in \033[1m{duration:.2f} seconds\033[0m"
     )
-    return {
+    result = {
         "duration": duration,
         "platform": sys.platform,
         "version": sys.version,
         "running_in_worker": RUNNING_IN_WORKER,
-        "randomize": randomize,
-        "passes": [test.as_dict for test in passed_tests],
-        "fails": [test.as_dict for test in failed_tests],
-        "skipped": [test.as_dict for test in skipped_tests],
+        "randomize": test_run.randomize,
+        "concurrency": test_run.concurrency,
+        "shard_index": test_run.shard_index,
+        "shard_count": test_run.shard_count,
+        "passes": passed_tests,
+        "fails": failed_tests,
+        "skipped": skipped_tests,
+        "timeouts": timed_out_tests,
+        "not_run": not_run_tests,
     }
+    if test_run.memory:
+        result["memory"] = test_run.memory.as_dict
+    return result
+
+
+def merge_results(*results):
+    """
+    Merge the result dictionaries returned by several calls to run (for
+    example, one for each shard of a test suite run in a different worker)
+    into a single result dictionary.
+
+    The lists of passing, failing, skipped, timed out and not run tests are
+    concatenated, and the duration is the combined duration of all the runs.
+    Details of the interpreter are taken from the first result. If the heap
+    usage was recorded, the usage of every module is listed, along with the
+    biggest growths of all the runs.
+    """
+    if not results:
+        raise ValueError("No results to merge.")
+    merged = dict(results[0])
+    merged["duration"] = 0
+    merged["shard_index"] = 0
+    merged["shard_count"] = 1
+    for bucket in RESULT_BUCKETS:
+        merged[bucket] = []
+    for result in results:
+        merged["duration"] += result["duration"]
+        for bucket in RESULT_BUCKETS:
+            merged[bucket].extend(result.get(bucket, []))
+    memories = [result["memory"] for result in results if "memory" in result]
+    if memories:
+        growths = []
+        modules = []
+        for memory in memories:
+            growths.extend(memory["growths"])
+            modules.extend(memory["modules"])
+        growths.sort(key=lambda g: g["growth"], reverse=True)
+        merged["memory"] = dict(memories[0])
+        top = max([len(memory["growths"]) for memory in memories])
+        merged["memory"]["growths"] = growths[:top]
+        merged["memory"]["modules"] = modules
+    return merged
+
+
+class Watcher:
+    """
+    Works out which test modules to run again after the test modules, or the
+    source modules they import, have changed.
+
+    While started, every import is recorded (via builtins.__import__) as an
+    edge from the importing module to the imported module, so the test
+    modules affected by a change to a source module can be found by
+    following these edges backwards. Changes are detected by polling the
+    size and modification time of the files of the modules that have been
+    imported from beneath the current working directory, and of the
+    directories in which test modules are found (for new test modules).
+    """
+
+    def __init__(self, targets, pattern="test_*.py", ignore=()):
+        """
+        A Watcher is instantiated with the same targets, pattern and ignore
+        globs as the test run whose test modules it watches.
+        """
+        self.targets = targets
+        self.pattern = pattern
+        self.ignore = ignore
+        # {module name: set of the names of the modules it imports}
+        self.imports = {}
+        # {test module name: (path, list of targets to run if it changes)}
+        self.test_modules = {}
+        # {path of a directory target: [module paths, directory stamps]}
+        self._directories = {}
+        # {path: stamp} of every watched file.
+        self._stamps = {}
+        self._checked = False
+        self._original_import = None
+        self._root = os.getcwd().rstrip("/") + "/"
+        for target in targets:
+            if "::" not in target and _is_directory(target):
+                self._find_test_modules(target)
+            else:
+                path = _normalize_path(target.split("::")[0])
+                name = module_name(path)
+                self.test_modules.setdefault(name, (path, []))[1].append(
+                    target
+                )
+
+    def _find_test_modules(self, target):
+        """
+        Find the test modules in the target directory, and return the paths
+        of those that were not already known.
+        """
+        module_paths, directories = find_modules(
+            target, self.pattern, self.ignore
+        )
+        self._directories[target] = [
+            module_paths,
+            dict([(d, _file_stamp(d)) for d in directories]),
+        ]
+        result = []
+        for path in module_paths:
+            name = module_name(path)
+            if name not in self.test_modules:
+                self.test_modules[name] = (path, [path])
+                result.append(path)
+        return result
+
+    def start(self):
+        """
+        Start recording imports, having unloaded any test modules already
+        imported (e.g. by an earlier test run in the same page), so the
+        imports they make are recorded when they are imported afresh.
+        """
+        import builtins
+
+        if self._original_import is not None:
+            return
+        original_import = builtins.__import__
+        imports = self.imports
+
+        def recording_import(
+            name, globals=None, locals=None, fromlist=(), level=0
+        ):
+            module = original_import(name, globals, locals, fromlist, level)
+            importer = globals.get("__name__") if globals else None
+            if importer and importer != __name__:
+                if level:
+                    package = globals.get("__package__")
+                    if not package:
+                        package = importer
+                        if "__path__" not in globals:
+                            package = importer.rpartition(".")[0]
+                    parts = package.split(".")
+                    base = ".".join(parts[: len(parts) - level + 1])
+                    name = base + "." + name if name else base
+                names = imports.setdefault(importer, set())
+                names.add(name)
+                for item in fromlist or ():
+                    if name + "." + item in sys.modules:
+                        names.add(name + "." + item)
+            return module
+
+        builtins.__import__ = recording_import
+        self._original_import = original_import
+        unload_modules(self.test_modules)
+
+    def stop(self):
+        """
+        Stop recording imports.
+        """
+        import builtins
+
+        if self._original_import is not None:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+
+    def _watched_files(self):
+        """
+        Return a dictionary of the paths of the files to watch (the test
+        modules, and the modules imported from beneath the current working
+        directory), and the names of the modules loaded from them.
+        """
+        result = {}
+        for name, (path, targets) in self.test_modules.items():
+            result[path] = name
+        for name, module in list(sys.modules.items()):
+            path = getattr(module, "__file__", None)
+            if not path or name in (__name__, "__main__"):
+                continue
+            if path.startswith(self._root):
+                path = path[len(self._root) :]
+            elif path.startswith("/"):
+                # Not part of the code under test (e.g. the standard library).
+                continue
+            result[_normalize_path(path)] = name
+        return result
+
+    def check(self):
+        """
+        Return the list of targets to run again because of the changes since
+        the last check (empty, the first time), having unloaded the modules
+        that changed and those that import them, so they are imported afresh.
+        """
+        new_paths = []
+        for target, (module_paths, stamps) in self._directories.items():
+            for directory, stamp in stamps.items():
+                if _file_stamp(directory) != stamp:
+                    new_paths.extend(self._find_test_modules(target))
+                    break
+        changed = set()
+        watched = self._watched_files()
+        for path, name in watched.items():
+            stamp = _file_stamp(path)
+            if path in self._stamps and self._stamps[path] != stamp:
+                changed.add(name)
+            self._stamps[path] = stamp
+        if not self._checked:
+            self._checked = True
+            return []
+        # Every module that imports a changed module (directly or not) must
+        # be imported afresh too, so it doesn't keep the outdated version.
+        importers = {}
+        for importer, imported in self.imports.items():
+            for name in imported:
+                importers.setdefault(name, set()).add(importer)
+        if changed and not self.imports:
+            # No imports were recorded (builtins.__import__ can't be replaced
+            # in this interpreter), so any test module may be affected.
+            changed.update(self.test_modules)
+        stale = set(changed)
+        pending = list(changed)
+        while pending:
+            for importer in importers.get(pending.pop(), ()):
+                if importer not in stale:
+                    stale.add(importer)
+                    pending.append(importer)
+        for name in stale:
+            self.imports.pop(name, None)
+        unload_modules(stale)
+        result = list(new_paths)
+        for name, (path, targets) in self.test_modules.items():
+            if name in stale and _exists(path):
+                result.extend([t for t in targets if t not in result])
+        return result
+
+
+async def watch(*args, **kwargs):
+    """
+    Run the test suite given args (as for run), then keep watching the test
+    modules and the modules they import for changes, running just the test
+    modules affected by each change again (having imported them, and the
+    changed modules, afresh). E.g.:
+
+    await upytest.watch("./tests", interval=0.1)
+
+    The files are polled for changes every `interval` seconds (the default is
+    0.25). If a named `max_runs` argument is provided, watching stops after
+    that many test runs (including the first), and the result of the last
+    run is returned. Otherwise, watching continues until the task awaiting
+    watch is cancelled. Any other named arguments are passed to run.
+
+    Imports are recorded by replacing builtins.__import__, so this works in
+    CPython and Pyodide (and MicroPython builds that allow builtins to be
+    overridden).
+    """
+    interval = kwargs.get("interval", 0.25)
+    max_runs = kwargs.get("max_runs")
+    watcher = Watcher(
+        list(args),
+        kwargs.get("pattern", "test_*.py"),
+        kwargs.get("collect_ignore", ()),
+    )
+    watcher.start()
+    try:
+        result = await run(*args, **kwargs)
+        watcher.check()
+        runs = 1
+        while max_runs is None or runs < max_runs:
+            await asyncio.sleep(interval)
+            targets = watcher.check()
+            if targets:
+                print(
+                    f"\n\033[1mChanges found, running: {', '.join(targets)}\033[0m"
+                )
+                result = await run(*targets, **kwargs)
+                runs += 1
+        return result
+    finally:
+        watcher.stop()